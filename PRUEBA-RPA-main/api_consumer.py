@@ -3,77 +3,220 @@ Módulo para consumir la Fake Store API
 Obtiene productos, guarda JSON de respaldo y procesa los datos
 """
 
+import asyncio
+import gzip
+import hashlib
+import logging
+import aiohttp
+import ijson
+import orjson
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import time
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import Callable, Iterable, List, Dict, Tuple, Optional
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 from pathlib import Path
 
-from config.settings import APISettings, FileSettings, DATA_DIR
+from config.settings import APISettings, FileSettings, DATA_DIR, ensure_directories
 from utils.logger import setup_logger
 
 
+def _is_retryable_async_error(exc: BaseException) -> bool:
+    """
+    Reintentar errores de red, timeouts, 429 y 5xx; un 4xx (p. ej. 404 de un ID) falla de inmediato
+    
+    Args:
+        exc: Excepción lanzada por la petición aiohttp
+        
+    Returns:
+        bool: True si vale la pena reintentar
+    """
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+# Campos requeridos de cada producto (la contención de conjuntos se resuelve en C)
+_REQUIRED_FIELDS = frozenset({'id', 'title', 'price', 'category', 'description'})
+
+
+@dataclass
+class Product:
+    """Producto procesado y validado (__slots__ evita un dict por instancia)"""
+    
+    __slots__ = ('id', 'title', 'price', 'category', 'description', 'fecha_insercion')
+    
+    id: int
+    title: str
+    price: float
+    category: str
+    description: str
+    fecha_insercion: datetime
+    
+    def as_dict(self) -> Dict:
+        """Representación como diccionario para los consumidores que usan claves"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
 class FakeStoreAPIConsumer:
     """Cliente para consumir la Fake Store API"""
     
+    # Tamaño de bloque al descargar el cuerpo de la respuesta
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    # Peticiones simultáneas en get_products_by_ids (por debajo de pool_maxsize)
+    MAX_CONCURRENT_REQUESTS = 16
+    
+    # Tamaño de los lotes entregados a on_batch en get_products
+    BATCH_SIZE = 5000
+    
     def __init__(self):
         self.logger = setup_logger("APIConsumer")
         self.api_url = "https://fakestoreapi.com/products"
-        self.session = requests.Session()
         self.headers = {
             "User-Agent": "Mozilla/5.0"
         }
         
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def get_products(self) -> Tuple[List[Dict], str]:
+        # Caché en proceso de categorías: (time.monotonic() de la consulta, categorías)
+        self._categories_cache: Optional[Tuple[float, List[str]]] = None
+        
+        # La sesión se crea en el primer uso (el cliente asíncrono solo usa los helpers)
+        self._session: Optional[requests.Session] = None
+    
+    @property
+    def session(self) -> requests.Session:
+        """Sesión requests compartida, creada de forma perezosa"""
+        return self._ensure_session()
+    
+    def _ensure_session(self) -> requests.Session:
+        """Crea la sesión si aún no existe y la retorna"""
+        if self._session is None:
+            self._session = self._build_session()
+        return self._session
+    
+    def _build_session(self) -> requests.Session:
+        """Crea la sesión con los headers del cliente y el adaptador de reintentos"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        
+        # Pool de conexiones keep-alive y única capa de reintentos (urllib3, a nivel de conexión):
+        # un reintento no repite log_step, el respaldo en disco ni el procesamiento
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=APISettings.RETRY_ATTEMPTS,
+                connect=APISettings.RETRY_ATTEMPTS,
+                read=APISettings.RETRY_ATTEMPTS,
+                backoff_factor=APISettings.BACKOFF_FACTOR,
+                backoff_jitter=APISettings.BACKOFF_JITTER,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=["GET"],
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def get_products(
+        self,
+        on_batch: Optional[Callable[[List[Product]], None]] = None
+    ) -> Tuple[List[Product], str]:
         """
         Obtiene productos de la API y guarda respaldo JSON
         
+        Args:
+            on_batch: Callback opcional que recibe lotes de BATCH_SIZE productos válidos a medida
+                que se procesan (con respuestas grandes, mientras la descarga continúa)
+        
         Returns:
-            Tuple[List[Dict], str]: Lista de productos y path del archivo JSON
+            Tuple[List[Product], str]: Lista de productos y path del archivo JSON
         """
         start_time = time.time()
         
         try:
             self.logger.log_step(1, "Consumo de API", "INICIADO")
             
-            # Realizar petición
-            self.logger.info(f"Consultando API: {APISettings.PRODUCTS_ENDPOINT}")
+            # Petición condicional si existe un respaldo previo con ETag
+            etag_state = self._read_etag_state()
+            request_headers = {"If-None-Match": etag_state["etag"]} if etag_state else None
+            
+            # Realizar petición (el cuerpo se descarga en streaming hacia el respaldo)
+            self.logger.info("Consultando API: %s", APISettings.PRODUCTS_ENDPOINT)
             response = self.session.get(
                 APISettings.PRODUCTS_ENDPOINT,
-                headers=self.headers,
-                timeout=APISettings.TIMEOUT
+                headers=request_headers,
+                timeout=APISettings.TIMEOUT,
+                stream=True
             )
             
             response_time = round((time.time() - start_time) * 1000, 2)
             
-            # Validar respuesta
-            response.raise_for_status()
-            
-            # Log de la llamada exitosa
+            # Registrar la llamada con el nivel según el resultado y luego validar
             self.logger.log_api_call(
                 APISettings.PRODUCTS_ENDPOINT,
                 "GET",
                 response.status_code,
-                response_time
+                response_time,
+                level=None if response.ok else logging.WARNING
             )
+            response.raise_for_status()
             
-            # Obtener datos JSON
-            products_data = response.json()
-            
-            if not isinstance(products_data, list):
-                raise ValueError("La respuesta de la API no es una lista válida")
-            
-            self.logger.info(f"✅ API respondió con {len(products_data)} productos")
-            
-            # Guardar respaldo JSON
-            json_filepath = self._save_json_backup(products_data)
+            if response.status_code == 304 and etag_state:
+                # Sin cambios: reutilizar el último respaldo sin descargar el cuerpo
+                response.close()
+                json_filepath = etag_state["backup_file"]
+                self.logger.info("♻️ API sin cambios (304), reutilizando respaldo: %s", json_filepath)
+                products_data = self._load_json_backup(json_filepath)
+                
+                if not isinstance(products_data, list):
+                    raise ValueError("El respaldo reutilizado no es una lista válida")
+                
+                total_products = len(products_data)
+                processed_products = self._process_products(products_data, on_batch)
+            elif self._should_stream_parse(response):
+                # Respuesta grande: validar productos a medida que llegan mientras se escribe el respaldo
+                json_filepath, sha256, processed_products, total_products = self._stream_json_backup(
+                    response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE),
+                    on_batch
+                )
+                
+                self._save_backup_metadata(json_filepath, total_products, sha256)
+                self._save_etag_state(response.headers.get("ETag"), json_filepath)
+            else:
+                # Cuerpo pequeño (bajo STREAM_PARSE_THRESHOLD): validarlo en memoria antes de
+                # tocar el respaldo, para no reemplazar el último bueno con una respuesta inválida
+                body = response.content
+                products_data = orjson.loads(body)
+                
+                if not isinstance(products_data, list):
+                    raise ValueError("La respuesta de la API no es una lista válida")
+                
+                # Guardar respaldo JSON (bytes idénticos a la respuesta de la API)
+                json_filepath, sha256 = self._save_json_backup([body])
+                
+                total_products = len(products_data)
+                self._save_backup_metadata(json_filepath, total_products, sha256)
+                self._save_etag_state(response.headers.get("ETag"), json_filepath)
+                
+                # Procesar productos
+                processed_products = self._process_products(products_data, on_batch)
             
-            # Procesar productos
-            processed_products = self._process_products(products_data)
+            self.logger.info("✅ API respondió con %s productos", total_products)
             
             self.logger.log_step(
                 1, "Consumo de API", "COMPLETADO",
@@ -82,58 +225,35 @@ class FakeStoreAPIConsumer:
             
             return processed_products, json_filepath
             
-        except requests.exceptions.Timeout:
-            self.logger.error("Timeout al consultar la API")
-            raise
-        except requests.exceptions.ConnectionError:
-            self.logger.error("Error de conexión con la API")
+        except requests.RequestException as e:
+            self.logger.error("Error en la API: %r", e)
             raise
-        except requests.exceptions.HTTPError as e:
-            self.logger.error(f"Error HTTP: {e.response.status_code}")
-            raise
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             self.logger.error("Error al decodificar respuesta JSON")
             raise
         except Exception as e:
-            self.logger.error(f"Error inesperado en consumo de API: {str(e)}")
+            self.logger.error("Error inesperado en consumo de API: %s", e)
             raise
     
-    def _save_json_backup(self, data: List[Dict]) -> str:
+    def _save_json_backup(self, chunks: Iterable[bytes]) -> Tuple[str, str]:
         """
-        Guarda respaldo JSON con timestamp
+        Guarda respaldo JSON con timestamp escribiendo el cuerpo tal cual llega
         
         Args:
-            data: Datos de productos de la API
+            chunks: Bloques de bytes de la respuesta de la API
             
         Returns:
-            str: Ruta del archivo JSON guardado
+            Tuple[str, str]: Ruta del archivo JSON guardado y el SHA-256 del JSON sin comprimir
         """
         try:
-            # Generar nombre de archivo con fecha
-            today = datetime.now().strftime(FileSettings.DATE_FORMAT)
-            filename = f"{FileSettings.JSON_PREFIX}{today}{FileSettings.JSON_EXTENSION}"
-            
-            # Ruta completa
-            raw_dir = DATA_DIR / "raw"
-            raw_dir.mkdir(exist_ok=True)
-            filepath = raw_dir / filename
-            
-            # Agregar metadata
-            backup_data = {
-                "timestamp": datetime.now().isoformat(),
-                "source_api": APISettings.PRODUCTS_ENDPOINT,
-                "total_products": len(data),
-                "products": data
-            }
-            
-            # Guardar archivo
-            with open(filepath, 'w', encoding=FileSettings.DEFAULT_ENCODING) as f:
-                json.dump(
-                    backup_data,
-                    f,
-                    ensure_ascii=FileSettings.JSON_ENSURE_ASCII,
-                    indent=FileSettings.JSON_INDENT
-                )
+            filepath = self._backup_filepath()
+            hasher = hashlib.sha256()
+            
+            # Guardar archivo sin decodificar ni re-serializar (gzip nivel bajo si está habilitado)
+            with self._writing_backup(filepath) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    hasher.update(chunk)
             
             file_size = filepath.stat().st_size
             
@@ -144,62 +264,286 @@ class FakeStoreAPIConsumer:
                 True
             )
             
-            return str(filepath)
+            return str(filepath), hasher.hexdigest()
             
         except Exception as e:
-            self.logger.error(f"Error al guardar respaldo JSON: {str(e)}")
+            self.logger.error("Error al guardar respaldo JSON: %s", e)
             raise
     
-    def _process_products(self, raw_products: List[Dict]) -> List[Dict]:
+    def _should_stream_parse(self, response: requests.Response) -> bool:
+        """Usa el parser incremental si el cuerpo supera el umbral o no declara su tamaño"""
+        content_length = response.headers.get("Content-Length")
+        if not content_length or not content_length.isdigit():
+            return True
+        return int(content_length) > APISettings.STREAM_PARSE_THRESHOLD
+    
+    def _stream_json_backup(
+        self,
+        chunks: Iterable[bytes],
+        on_batch: Optional[Callable[[List[Product]], None]] = None
+    ) -> Tuple[str, str, List[Product], int]:
+        """
+        Escribe el respaldo y procesa los productos en una sola pasada con ijson,
+        sin materializar la lista completa de la respuesta
+        
+        Args:
+            chunks: Bloques de bytes de la respuesta de la API
+            on_batch: Callback opcional para lotes de productos válidos (ver get_products)
+            
+        Returns:
+            Tuple[str, str, List[Product], int]: Ruta del respaldo, SHA-256 del JSON,
+            productos procesados y total de productos recibidos
+        """
+        filepath = self._backup_filepath()
+        hasher = hashlib.sha256()
+        items = ijson.sendable_list()
+        parser = ijson.items_coro(items, 'item', use_float=True)
+        total_products = 0
+        is_array = None
+        
+        try:
+            with self._writing_backup(filepath) as f:
+                def raw_products():
+                    nonlocal total_products, is_array
+                    for chunk in chunks:
+                        if is_array is None and chunk.strip():
+                            is_array = chunk.lstrip()[:1] == b'['
+                        
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        parser.send(chunk)
+                        
+                        # Entregar los productos ya completos y liberar el búfer
+                        total_products += len(items)
+                        yield from items
+                        del items[:]
+                    
+                    parser.close()
+                    total_products += len(items)
+                    yield from items
+                
+                processed_products = self._process_products(raw_products(), on_batch)
+                
+                # Dentro del bloque: una respuesta que no es lista no reemplaza el respaldo
+                if not is_array:
+                    raise ValueError("La respuesta de la API no es una lista válida")
+            
+            self.logger.log_file_operation(
+                "JSON_BACKUP",
+                str(filepath),
+                filepath.stat().st_size,
+                True
+            )
+            
+            return str(filepath), hasher.hexdigest(), processed_products, total_products
+            
+        except Exception as e:
+            self.logger.error("Error al guardar respaldo JSON: %s", e)
+            raise
+    
+    def _backup_filepath(self) -> Path:
+        """Ruta del respaldo JSON del día"""
+        today = datetime.now().strftime(FileSettings.DATE_FORMAT)
+        extension = FileSettings.JSON_GZIP_EXTENSION if FileSettings.COMPRESS_BACKUP else FileSettings.JSON_EXTENSION
+        filename = f"{FileSettings.JSON_PREFIX}{today}{extension}"
+        
+        ensure_directories()
+        return DATA_DIR / "raw" / filename
+    
+    def _etag_path(self) -> Path:
+        """Ruta del archivo con el ETag del último respaldo descargado"""
+        return DATA_DIR / FileSettings.ETAG_FILENAME
+    
+    def _read_etag_state(self) -> Optional[Dict[str, str]]:
+        """
+        Lee el ETag persistido y el respaldo al que corresponde
+        
+        Returns:
+            Optional[Dict[str, str]]: {"etag", "backup_file"} o None si no hay respaldo reutilizable
+        """
+        try:
+            with open(self._etag_path(), 'rb') as f:
+                state = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        
+        if not state.get("etag") or not Path(state.get("backup_file", "")).is_file():
+            return None
+        return state
+    
+    def _save_etag_state(self, etag: Optional[str], backup_file: str):
+        """Persiste el ETag de la respuesta junto con la ruta del respaldo (o lo descarta si no hay)"""
+        etag_path = self._etag_path()
+        try:
+            if etag:
+                with open(etag_path, 'wb') as f:
+                    f.write(orjson.dumps({"etag": etag, "backup_file": backup_file}))
+            elif etag_path.exists():
+                etag_path.unlink()
+        except OSError as e:
+            self.logger.warning("No se pudo guardar el ETag: %s", e)
+    
+    @contextmanager
+    def _writing_backup(self, filepath: Path):
+        """
+        Escribe el respaldo en un archivo hermano .part y lo mueve a filepath (os.replace, atómico)
+        solo si el bloque termina sin errores. Una descarga cortada o inválida borra el temporal
+        y deja intacto el respaldo anterior, al que puede seguir apuntando el .etag.
+        
+        Args:
+            filepath: Ruta final del respaldo
+        """
+        part_path = filepath.with_name(filepath.name + '.part')
+        compressed = filepath.name.endswith(FileSettings.JSON_GZIP_EXTENSION)
+        try:
+            with self._open_backup(part_path, 'wb', compressed) as f:
+                yield f
+            os.replace(part_path, filepath)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+    
+    def _open_backup(self, filepath, mode: str, compressed: Optional[bool] = None):
+        """Abre el respaldo en modo binario, con gzip si la ruta termina en .json.gz (o compressed=True)"""
+        if compressed is None:
+            compressed = str(filepath).endswith(FileSettings.JSON_GZIP_EXTENSION)
+        if compressed:
+            if 'w' in mode:
+                return gzip.open(filepath, mode, compresslevel=FileSettings.GZIP_COMPRESS_LEVEL)
+            return gzip.open(filepath, mode)
+        return open(filepath, mode)
+    
+    def _load_json_backup(self, filepath: str):
+        """Decodifica el respaldo JSON guardado (orjson sobre los bytes crudos)"""
+        with self._open_backup(filepath, 'rb') as f:
+            return orjson.loads(f.read())
+    
+    def _save_backup_metadata(self, filepath: str, total_products: int, sha256: str) -> str:
+        """
+        Guarda los metadatos del respaldo en un archivo .meta.json paralelo
+        
+        Args:
+            filepath: Ruta del respaldo JSON
+            total_products: Cantidad de productos recibidos
+            sha256: Hash del cuerpo de la respuesta
+            
+        Returns:
+            str: Ruta del archivo de metadatos
+        """
+        backup_path = Path(filepath)
+        base_name = backup_path.name.split('.', 1)[0]
+        meta_path = backup_path.with_name(f"{base_name}{FileSettings.JSON_META_EXTENSION}")
+        
+        metadata = {
+            "timestamp": datetime.now().isoformat(),
+            "source_api": APISettings.PRODUCTS_ENDPOINT,
+            "total_products": total_products,
+            "sha256": sha256,
+            "backup_file": backup_path.name,
+            "compression": "gzip" if backup_path.name.endswith(FileSettings.JSON_GZIP_EXTENSION) else None
+        }
+        
+        # orjson emite bytes UTF-8 directamente
+        with open(meta_path, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+        
+        return str(meta_path)
+    
+    def _process_products(
+        self,
+        raw_products: Iterable[Dict],
+        on_batch: Optional[Callable[[List[Product]], None]] = None
+    ) -> List[Product]:
         """
         Procesa y valida los productos obtenidos de la API
         
         Args:
-            raw_products: Lista de productos sin procesar
+            raw_products: Productos sin procesar (lista o iterador incremental)
+            on_batch: Callback opcional que recibe cada lote de BATCH_SIZE productos válidos
             
         Returns:
-            List[Dict]: Lista de productos procesados
+            List[Product]: Lista de productos procesados
         """
         processed_products = []
         
+        # Un único timestamp de ingesta para todo el lote
+        insertion_ts = datetime.now()
+        
+        # Motivos de rechazo: una sola advertencia resumen al final en lugar de una por fila
+        rejected = Counter()
+        debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+        
+        i = 0
+        flushed = 0
         for i, product in enumerate(raw_products, 1):
+            # Entregar el lote completo antes de seguir (fuera del try para no ocultar errores del callback)
+            if on_batch is not None and len(processed_products) - flushed >= self.BATCH_SIZE:
+                on_batch(processed_products[flushed:])
+                flushed = len(processed_products)
+            
             try:
                 # Validar campos requeridos
-                required_fields = ['id', 'title', 'price', 'category', 'description']
-                
-                if not all(field in product for field in required_fields):
-                    self.logger.warning(f"Producto {i} omitido por campos faltantes")
+                if not _REQUIRED_FIELDS.issubset(product):
+                    rejected["campos_faltantes"] += 1
+                    if debug_enabled:
+                        self.logger.debug("Producto %s omitido por campos faltantes", i)
                     continue
                 
                 # Procesar producto
-                processed_product = {
-                    'id': int(product['id']),
-                    'title': str(product['title']).strip(),
-                    'price': float(product['price']),
-                    'category': str(product['category']).strip(),
-                    'description': str(product['description']).strip(),
-                    'fecha_insercion': datetime.now()
-                }
+                processed_product = Product(
+                    id=int(product['id']),
+                    title=str(product['title']).strip(),
+                    price=float(product['price']),
+                    category=str(product['category']).strip(),
+                    description=str(product['description']).strip(),
+                    fecha_insercion=insertion_ts
+                )
                 
                 # Validaciones adicionales
-                if processed_product['price'] <= 0:
-                    self.logger.warning(f"Producto {processed_product['id']} tiene precio inválido")
+                if processed_product.price <= 0:
+                    rejected["precio_invalido"] += 1
+                    if debug_enabled:
+                        self.logger.debug("Producto %s tiene precio inválido", processed_product.id)
                     continue
                 
-                if len(processed_product['title']) < 3:
-                    self.logger.warning(f"Producto {processed_product['id']} tiene título muy corto")
+                if len(processed_product.title) < 3:
+                    rejected["titulo_corto"] += 1
+                    if debug_enabled:
+                        self.logger.debug("Producto %s tiene título muy corto", processed_product.id)
                     continue
                 
                 processed_products.append(processed_product)
                 
-            except (ValueError, KeyError, TypeError) as e:
-                self.logger.warning(f"Error procesando producto {i}: {str(e)}")
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                rejected["error_formato"] += 1
+                if debug_enabled:
+                    self.logger.debug("Error procesando producto %s: %s", i, e)
                 continue
         
-        self.logger.info(f"Procesados {len(processed_products)} de {len(raw_products)} productos")
+        if on_batch is not None and len(processed_products) > flushed:
+            on_batch(processed_products[flushed:])
+        
+        if rejected:
+            self.logger.warning(
+                "Rechazados %s productos: %s", sum(rejected.values()), dict(rejected)
+            )
+        
+        self.logger.info("Procesados %s de %s productos", len(processed_products), i)
         return processed_products
     
-    def get_product_by_id(self, product_id: int) -> Optional[Dict]:
+    def _fetch_json(self, url: str):
+        """GET (reintentos en el adaptador de la sesión) que devuelve el cuerpo JSON decodificado"""
+        response = self.session.get(url, timeout=APISettings.TIMEOUT)
+        
+        self.logger.log_api_call(
+            url, "GET", response.status_code,
+            level=None if response.ok else logging.WARNING
+        )
+        response.raise_for_status()
+        
+        return orjson.loads(response.content)
+    
+    def get_product_by_id(self, product_id: int) -> Optional[Product]:
         """
         Obtiene un producto específico por ID
         
@@ -207,23 +551,35 @@ class FakeStoreAPIConsumer:
             product_id: ID del producto
             
         Returns:
-            Dict: Datos del producto o None si no existe
+            Product: Datos del producto o None si no existe
         """
         try:
-            url = f"{APISettings.PRODUCTS_ENDPOINT}/{product_id}"
-            response = self.session.get(url, timeout=APISettings.TIMEOUT)
-            
-            response.raise_for_status()
-            product_data = response.json()
-            
-            self.logger.log_api_call(url, "GET", response.status_code)
-            
+            product_data = self._fetch_json(f"{APISettings.PRODUCTS_ENDPOINT}/{product_id}")
             return self._process_products([product_data])[0] if product_data else None
             
         except Exception as e:
-            self.logger.error(f"Error obteniendo producto {product_id}: {str(e)}")
+            self.logger.error("Error obteniendo producto %s: %s", product_id, e)
             return None
     
+    def get_products_by_ids(self, ids: List[int]) -> List[Optional[Product]]:
+        """
+        Obtiene varios productos por ID en paralelo sobre la sesión compartida
+        
+        Args:
+            ids: IDs de los productos
+            
+        Returns:
+            List[Optional[Product]]: Productos en el mismo orden que ids (None si falló)
+        """
+        if not ids:
+            return []
+        
+        # Crear la sesión antes de repartir las peticiones entre hilos (una sola, compartida)
+        self._ensure_session()
+        
+        with ThreadPoolExecutor(max_workers=min(self.MAX_CONCURRENT_REQUESTS, len(ids))) as executor:
+            return list(executor.map(self.get_product_by_id, ids))
+    
     def get_categories(self) -> List[str]:
         """
         Obtiene las categorías disponibles
@@ -231,22 +587,33 @@ class FakeStoreAPIConsumer:
         Returns:
             List[str]: Lista de categorías
         """
+        cached = self._get_cached_categories()
+        if cached is not None:
+            return cached
+        
         try:
-            url = f"{APISettings.PRODUCTS_ENDPOINT}/categories"
-            response = self.session.get(url, timeout=APISettings.TIMEOUT)
-            
-            response.raise_for_status()
-            categories = response.json()
-            
-            self.logger.log_api_call(url, "GET", response.status_code)
-            self.logger.info(f"Obtenidas {len(categories)} categorías")
+            categories = self._fetch_json(f"{APISettings.PRODUCTS_ENDPOINT}/categories")
+            self.logger.info("Obtenidas %s categorías", len(categories))
             
-            return categories
+            self._categories_cache = (time.monotonic(), categories)
+            return list(categories)
             
         except Exception as e:
-            self.logger.error(f"Error obteniendo categorías: {str(e)}")
+            self.logger.error("Error obteniendo categorías: %s", e)
             return []
     
+    def _get_cached_categories(self) -> Optional[List[str]]:
+        """Devuelve las categorías en caché si no superan APISettings.CATEGORIES_CACHE_TTL"""
+        if self._categories_cache is None:
+            return None
+        
+        fetched_at, categories = self._categories_cache
+        if time.monotonic() - fetched_at >= APISettings.CATEGORIES_CACHE_TTL:
+            self._categories_cache = None
+            return None
+        
+        return list(categories)
+    
     def validate_api_connection(self) -> bool:
         """
         Valida que la API esté disponible
@@ -257,7 +624,6 @@ class FakeStoreAPIConsumer:
         try:
             response = self.session.get(
                 self.api_url,
-                headers=self.headers,
                 timeout=10
             )
             
@@ -265,11 +631,11 @@ class FakeStoreAPIConsumer:
                 self.logger.info("✅ API está disponible")
                 return True
             else:
-                self.logger.warning(f"⚠️ API respondió con código: {response.status_code}")
+                self.logger.warning("⚠️ API respondió con código: %s", response.status_code)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"❌ API no está disponible: {str(e)}")
+            self.logger.error("❌ API no está disponible: %s", e)
             return False
     
     def __enter__(self):
@@ -278,8 +644,164 @@ class FakeStoreAPIConsumer:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit - cerrar sesión"""
-        if hasattr(self, 'session'):
-            self.session.close()
+        if self._session is not None:
+            self._session.close()
+
+
+class AsyncFakeStoreAPIConsumer:
+    """
+    Cliente asíncrono (aiohttp) para la Fake Store API
+
+    Delega el respaldo JSON, la validación y la caché de categorías en un
+    FakeStoreAPIConsumer interno (sin heredar su API síncrona ni crear su sesión
+    requests) y permite lanzar
+    varias peticiones concurrentes con asyncio.gather
+    """
+    
+    def __init__(self):
+        self.logger = setup_logger("AsyncAPIConsumer")
+        # Helpers compartidos con el cliente síncrono; sus logs salen por este logger
+        self._helpers = FakeStoreAPIConsumer()
+        self._helpers.logger = self.logger
+        self._aio_session: Optional[aiohttp.ClientSession] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Crea la sesión aiohttp de forma perezosa (debe existir un event loop activo)"""
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                headers=self._helpers.headers,
+                timeout=aiohttp.ClientTimeout(total=APISettings.TIMEOUT),
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+            )
+        return self._aio_session
+    
+    async def _get_bytes(self, url: str) -> bytes:
+        """GET con reintentos que devuelve el cuerpo sin decodificar"""
+        session = self._get_session()
+        
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(APISettings.RETRY_ATTEMPTS),
+            wait=wait_random_exponential(multiplier=1, max=10),
+            retry=retry_if_exception(_is_retryable_async_error),
+            reraise=True
+        ):
+            with attempt:
+                start_time = time.time()
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    body = await resp.read()
+                
+                response_time = round((time.time() - start_time) * 1000, 2)
+                self.logger.log_api_call(url, "GET", resp.status, response_time)
+                return body
+    
+    async def _get_json(self, url: str):
+        """GET con reintentos que devuelve el cuerpo JSON decodificado"""
+        return orjson.loads(await self._get_bytes(url))
+    
+    async def get_products(self) -> Tuple[List[Product], str]:
+        """
+        Obtiene productos de la API y guarda respaldo JSON
+        
+        Returns:
+            Tuple[List[Product], str]: Lista de productos y path del archivo JSON
+        """
+        try:
+            self.logger.log_step(1, "Consumo de API (async)", "INICIADO")
+            
+            body = await self._get_bytes(APISettings.PRODUCTS_ENDPOINT)
+            
+            products_data = orjson.loads(body)
+            
+            if not isinstance(products_data, list):
+                raise ValueError("La respuesta de la API no es una lista válida")
+            
+            # Escritura en disco fuera del event loop (no bloquea otras tareas del gather), solo con
+            # una respuesta ya validada
+            json_filepath, sha256 = await asyncio.to_thread(self._helpers._save_json_backup, [body])
+            
+            self.logger.info("✅ API respondió con %s productos", len(products_data))
+            await asyncio.to_thread(
+                self._helpers._save_backup_metadata, json_filepath, len(products_data), sha256
+            )
+            
+            processed_products = self._helpers._process_products(products_data)
+            
+            self.logger.log_step(
+                1, "Consumo de API (async)", "COMPLETADO",
+                {"productos_obtenidos": len(processed_products), "archivo_json": json_filepath}
+            )
+            
+            return processed_products, json_filepath
+            
+        except Exception as e:
+            self.logger.error("Error en consumo de API (async): %s", e)
+            raise
+    
+    async def get_product_by_id(self, product_id: int) -> Optional[Product]:
+        """
+        Obtiene un producto específico por ID
+        
+        Args:
+            product_id: ID del producto
+            
+        Returns:
+            Product: Datos del producto o None si no existe
+        """
+        try:
+            product_data = await self._get_json(f"{APISettings.PRODUCTS_ENDPOINT}/{product_id}")
+            return self._helpers._process_products([product_data])[0] if product_data else None
+            
+        except Exception as e:
+            self.logger.error("Error obteniendo producto %s: %s", product_id, e)
+            return None
+    
+    async def get_products_bulk(self, ids: List[int]) -> List[Optional[Product]]:
+        """
+        Obtiene varios productos por ID de forma concurrente
+        
+        Args:
+            ids: IDs de los productos
+            
+        Returns:
+            List[Optional[Product]]: Productos en el mismo orden que ids (None si falló)
+        """
+        return list(await asyncio.gather(*[self.get_product_by_id(pid) for pid in ids]))
+    
+    async def get_categories(self) -> List[str]:
+        """
+        Obtiene las categorías disponibles
+        
+        Returns:
+            List[str]: Lista de categorías
+        """
+        cached = self._helpers._get_cached_categories()
+        if cached is not None:
+            return cached
+        
+        try:
+            categories = await self._get_json(f"{APISettings.PRODUCTS_ENDPOINT}/categories")
+            self.logger.info("Obtenidas %s categorías", len(categories))
+            
+            self._helpers._categories_cache = (time.monotonic(), categories)
+            return list(categories)
+            
+        except Exception as e:
+            self.logger.error("Error obteniendo categorías: %s", e)
+            return []
+    
+    async def close(self):
+        """Cierra la sesión aiohttp"""
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+    
+    async def __aenter__(self):
+        """Async context manager entry"""
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit - cerrar sesiones"""
+        await self.close()
 
 
 def test_api_consumer():
@@ -295,13 +817,13 @@ def test_api_consumer():
             # Obtener productos
             products, json_path = api_client.get_products()
             
-            logger.info(f"✅ Test exitoso: {len(products)} productos obtenidos")
-            logger.info(f"📄 JSON guardado en: {json_path}")
+            logger.info("✅ Test exitoso: %s productos obtenidos", len(products))
+            logger.info("📄 JSON guardado en: %s", json_path)
             
             return True
             
     except Exception as e:
-        logger.error(f"❌ Test fallido: {str(e)}")
+        logger.error("❌ Test fallido: %s", e)
         return False
 
 
@@ -16,7 +16,9 @@ from .settings import (
     DATA_DIR,
     REPORTS_DIR,
     LOGS_DIR,
-    EVIDENCES_DIR
+    EVIDENCES_DIR,
+    ensure_directories,
+    validate_settings
 )
 
 __all__ = [
@@ -33,7 +35,9 @@ __all__ = [
     'DATA_DIR',
     'REPORTS_DIR',
     'LOGS_DIR',
-    'EVIDENCES_DIR'
+    'EVIDENCES_DIR',
+    'ensure_directories',
+    'validate_settings'
 ]
 
 __version__ = '1.0.0'
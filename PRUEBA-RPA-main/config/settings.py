@@ -3,6 +3,7 @@ Configuraciones centralizadas para el proyecto RPA
 """
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -16,14 +17,17 @@ REPORTS_DIR = BASE_DIR / "reports"
 LOGS_DIR = BASE_DIR / "logs"
 EVIDENCES_DIR = BASE_DIR / "evidencias"
 
-# Crear directorios si no existen
-for directory in [DATA_DIR, REPORTS_DIR, LOGS_DIR, EVIDENCES_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
-    
-# Subdirectorios de data
-(DATA_DIR / "raw").mkdir(exist_ok=True)
-(DATA_DIR / "database").mkdir(exist_ok=True)
-(DATA_DIR / "temp").mkdir(exist_ok=True)
+
+@lru_cache(maxsize=1)
+def ensure_directories():
+    """Crea los directorios del proyecto una sola vez por proceso (bajo demanda, no al importar)"""
+    for directory in [DATA_DIR, REPORTS_DIR, LOGS_DIR, EVIDENCES_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
+    
+    # Subdirectorios de data
+    (DATA_DIR / "raw").mkdir(exist_ok=True)
+    (DATA_DIR / "database").mkdir(exist_ok=True)
+    (DATA_DIR / "temp").mkdir(exist_ok=True)
 
 
 class APISettings:
@@ -34,6 +38,9 @@ class APISettings:
     TIMEOUT = int(os.getenv('API_TIMEOUT', 30))
     RETRY_ATTEMPTS = int(os.getenv('API_RETRY_ATTEMPTS', 3))
     BACKOFF_FACTOR = float(os.getenv('RETRY_BACKOFF_FACTOR', 0.3))
+    BACKOFF_JITTER = float(os.getenv('RETRY_BACKOFF_JITTER', 0.3))  # segundos aleatorios extra por reintento
+    CATEGORIES_CACHE_TTL = int(os.getenv('API_CATEGORIES_CACHE_TTL', 3600))  # segundos
+    STREAM_PARSE_THRESHOLD = int(os.getenv('API_STREAM_PARSE_THRESHOLD', 5 * 1024 * 1024))  # bytes
     
     # Headers para las peticiones
     HEADERS = {
@@ -52,16 +59,24 @@ class DatabaseSettings:
     
     # Configuraciones de conexión
     TIMEOUT = 30
-    ISOLATION_LEVEL = None  # Autocommit
+    ISOLATION_LEVEL = 'IMMEDIATE'  # cada escritura abre BEGIN IMMEDIATE implícito; 'with conn' confirma
     
     # Configuraciones de rendimiento
     JOURNAL_MODE = 'WAL'
     SYNCHRONOUS = 'NORMAL'
-    CACHE_SIZE = 2000
+    CACHE_SIZE = -65536  # negativo = KiB (64 MiB de caché de páginas)
+    TEMP_STORE = 'MEMORY'
+    MMAP_SIZE = int(os.getenv('DATABASE_MMAP_SIZE', 268435456))  # 256 MiB de lecturas mapeadas en memoria
+    WAL_AUTOCHECKPOINT = int(os.getenv('DATABASE_WAL_AUTOCHECKPOINT', 1000))  # páginas
+    CACHED_STATEMENTS = 256  # sentencias preparadas reutilizadas por la conexión
+    
+    # Lotes de al menos este tamaño eliminan y recrean los índices secundarios alrededor del insert
+    INDEX_REBUILD_THRESHOLD = int(os.getenv('DATABASE_INDEX_REBUILD_THRESHOLD', 10000))
     
     @classmethod
     def get_connection_string(cls):
         """Retorna la cadena de conexión"""
+        ensure_directories()
         return str(cls.DATABASE_PATH.absolute())
 
 
@@ -80,6 +95,9 @@ class OneDriveSettings:
     # Comportamiento ante conflicto de nombre de archivo: 'replace' (default) o 'rename'
     CONFLICT_BEHAVIOR = os.getenv('ONEDRIVE_CONFLICT_BEHAVIOR', 'replace')
     
+    # Dejar que OneDrive cree las carpetas padre en la subida (false = crearlas explícitamente antes)
+    AUTO_CREATE_PARENTS = os.getenv('ONEDRIVE_AUTO_CREATE_PARENTS', 'true').lower() == 'true'
+    
     # Configuraciones de Graph API
     GRAPH_URL = 'https://graph.microsoft.com/v1.0'
     SCOPE = ['https://graph.microsoft.com/.default']
@@ -89,9 +107,17 @@ class OneDriveSettings:
     TARGET_USER_EMAIL = os.getenv('ONEDRIVE_USER_EMAIL')  # e.g. user@domain.com
     
     # Configuraciones de subida
-    CHUNK_SIZE = 1024 * 1024 * 4  # 4MB chunks para archivos grandes
+    CHUNK_SIZE = 320 * 1024 * 13  # ~4MB chunks para archivos grandes (Graph exige múltiplos de 320 KiB)
     MAX_FILE_SIZE = 1024 * 1024 * 250  # 250MB máximo
     
+    # Reintentos del adaptador HTTP (429/5xx, respetando Retry-After)
+    RETRY_ATTEMPTS = int(os.getenv('ONEDRIVE_RETRY_ATTEMPTS', 3))
+    RETRY_BACKOFF = 0.5
+    
+    # Caché de tokens MSAL entre ejecuciones y margen de renovación antes de expirar (segundos)
+    TOKEN_CACHE_PATH = Path(os.getenv('ONEDRIVE_TOKEN_CACHE', str(DATA_DIR / 'msal_token_cache.bin')))
+    TOKEN_REFRESH_MARGIN = 60
+    
     @classmethod
     def get_drive_base_url(cls):
         """Devuelve la URL base del drive para Graph API, compatible con app-only o delegada"""
@@ -116,8 +142,20 @@ class WebAutomationSettings:
     # Configuraciones de Selenium
     HEADLESS = os.getenv('WEBDRIVER_HEADLESS', 'false').lower() == 'true'
     TIMEOUT = int(os.getenv('WEBDRIVER_TIMEOUT', 30))
-    IMPLICIT_WAIT = 10
+    STEP_TIMEOUT = float(os.getenv('WEBDRIVER_STEP_TIMEOUT', 3))  # esperas cortas (campo, subida)
+    POLL_FREQUENCY = float(os.getenv('WEBDRIVER_POLL_FREQUENCY', 0.1))  # segundos entre sondeos
     PAGE_LOAD_TIMEOUT = 30
+    # 'eager': driver.get() retorna con el DOM listo, sin esperar imágenes/fuentes/beacons
+    PAGE_LOAD_STRATEGY = os.getenv('WEBDRIVER_PAGE_LOAD_STRATEGY', 'eager')
+    
+    # No descargar imágenes, fuentes ni analítica al cargar el formulario; el bloqueo se
+    # levanta antes de enviarlo para que la página de confirmación (evidencia) se vea completa
+    BLOCK_RESOURCES = os.getenv('WEBDRIVER_BLOCK_RESOURCES', 'true').lower() == 'true'
+    BLOCKED_URL_PATTERNS = [
+        '*.png', '*.jpg', '*.jpeg', '*.webp', '*.svg', '*.gif',
+        '*.woff', '*.woff2', '*.ttf', '*.mp4', '*.webm',
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    ]
     
     # Configuraciones de Chrome
     CHROME_OPTIONS = [
@@ -126,6 +164,7 @@ class WebAutomationSettings:
         '--disable-gpu',
         '--disable-extensions',
         '--disable-plugins',
+        '--no-first-run',
         '--window-size=1920,1080'
     ]
     
@@ -133,8 +172,10 @@ class WebAutomationSettings:
         CHROME_OPTIONS.append('--headless')
     
     # Configuraciones de screenshots
-    SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 95))
-    SCREENSHOT_FORMAT = 'PNG'
+    # 'jpeg' (Chrome la codifica directamente vía CDP, archivos varias veces menores) o 'png'
+    SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'jpeg').lower()
+    SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 80))  # solo aplica a JPEG
+    SCREENSHOT_EXTENSION = '.jpg' if SCREENSHOT_FORMAT == 'jpeg' else '.png'
     
     # Datos del formulario
     FORM_DATA = {
@@ -144,15 +185,17 @@ class WebAutomationSettings:
     
     @classmethod
     def is_configured(cls):
-        """Verifica si la automatización web está configurada"""
-        return bool(cls.FORM_URL)
+        """Verifica si la automatización web está configurada (URL http/https, sin abrir Chrome)"""
+        return bool(cls.FORM_URL) and cls.FORM_URL.lower().startswith(('http://', 'https://'))
 
 
 class ExcelSettings:
     """Configuraciones para generación de reportes Excel"""
     
-    ENGINE = os.getenv('EXCEL_ENGINE', 'openpyxl')
+    ENGINE = os.getenv('EXCEL_ENGINE', 'xlsxwriter')  # 'xlsxwriter' (por defecto) u 'openpyxl'
     INCLUDE_CHARTS = os.getenv('INCLUDE_CHARTS', 'true').lower() == 'true'
+    # 'native' (gráfico de Excel) o 'image' (PNG renderizado con matplotlib, si está instalado)
+    CHART_STYLE = os.getenv('EXCEL_CHART_STYLE', 'native')
     LANGUAGE = os.getenv('REPORT_LANGUAGE', 'es')
     
     # Configuraciones de formato
@@ -197,6 +240,7 @@ class LoggingSettings:
     TO_FILE = os.getenv('LOG_TO_FILE', 'true').lower() == 'true'
     TO_CONSOLE = os.getenv('LOG_TO_CONSOLE', 'true').lower() == 'true'
     MAX_FILES = int(os.getenv('LOG_MAX_FILES', 7))
+    MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 5_000_000))  # tamaño antes de rotar el log del proceso
     
     # Configuraciones de archivos
     LOG_FORMAT = '%(asctime)s | %(name)s | %(levelname)s | %(message)s'
@@ -213,22 +257,40 @@ class FileSettings:
     # Formatos de fecha para nombres de archivo
     DATE_FORMAT = '%Y-%m-%d'
     DATETIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
+    JOURNAL_DATE_FORMAT = '%Y%m%d'
     
     # Prefijos para diferentes tipos de archivo
     JSON_PREFIX = 'Productos_'
     EXCEL_PREFIX = 'Reporte_'
     EVIDENCE_PREFIX = 'evidencia_'
+    EVIDENCE_JOURNAL_PREFIX = 'run_'
     
     # Extensiones
     JSON_EXTENSION = '.json'
+    JSON_META_EXTENSION = '.meta.json'
+    JSON_GZIP_EXTENSION = '.json.gz'
+    JSONL_EXTENSION = '.jsonl'
+    NDJSON_EXTENSION = '.ndjson'
+    
+    # Estado de peticiones condicionales (ETag del último respaldo descargado)
+    ETAG_FILENAME = '.etag'
     EXCEL_EXTENSION = '.xlsx'
     IMAGE_EXTENSION = '.png'
+    SCREENSHOT_EXTENSIONS = ('.png', '.jpg')
     LOG_EXTENSION = '.log'
     
     # Configuraciones de encoding
     DEFAULT_ENCODING = 'utf-8'
     JSON_ENSURE_ASCII = False
     JSON_INDENT = 2
+    
+    # Por encima de este número de eventos+archivos, el log de evidencias se escribe sin indentar
+    # y los registros van a un .ndjson aparte (una línea por registro)
+    EVIDENCE_INLINE_LIMIT = int(os.getenv('EVIDENCE_INLINE_LIMIT', 500))
+    
+    # Compresión del respaldo JSON (false conserva el .json plano para depuración)
+    COMPRESS_BACKUP = os.getenv('COMPRESS_BACKUP', 'true').lower() == 'true'
+    GZIP_COMPRESS_LEVEL = int(os.getenv('GZIP_COMPRESS_LEVEL', 1))
 
 
 class SecuritySettings:
@@ -243,7 +305,7 @@ class SecuritySettings:
     
     # Configuraciones de validación
     MAX_FILE_SIZE_MB = 100
-    ALLOWED_EXTENSIONS = ['.json', '.xlsx', '.png', '.pdf']
+    ALLOWED_EXTENSIONS = ['.json', '.xlsx', '.png', '.jpg', '.pdf']
     
     # Timeout de operaciones
     DEFAULT_TIMEOUT = 30
@@ -265,29 +327,37 @@ class PIXRPASettings:
     MAX_WORKERS = 1  # PIX RPA funciona mejor con un solo hilo
 
 
-# Validar configuraciones críticas al importar
-def validate_settings():
-    """Valida que las configuraciones críticas estén presentes"""
+# Validar configuraciones críticas (el punto de entrada decide cuándo llamarla)
+def validate_settings(verbose=False):
+    """
+    Valida que las configuraciones críticas estén presentes
+    
+    Args:
+        verbose: Si es True imprime advertencias y el resultado de la validación
+    """
     errors = []
     
     # Validar base de datos
-    if not DatabaseSettings.DATABASE_PATH.parent.exists():
-        try:
-            DatabaseSettings.DATABASE_PATH.parent.mkdir(parents=True)
-        except Exception as e:
-            errors.append(f"No se puede crear directorio de BD: {e}")
-    
-    # Validar OneDrive (opcional)
-    if not OneDriveSettings.is_configured():
-        print("⚠️ WARNING: OneDrive no está configurado completamente")
-    
-    # Validar automatización web (opcional)
-    if not WebAutomationSettings.is_configured():
-        print("⚠️ WARNING: Automatización web no está configurada")
+    try:
+        ensure_directories()
+    except Exception as e:
+        errors.append(f"No se puede crear directorio de BD: {e}")
+    
+    if verbose:
+        # Validar OneDrive (opcional)
+        if not OneDriveSettings.is_configured():
+            print("⚠️ WARNING: OneDrive no está configurado completamente")
+        
+        # Validar automatización web (opcional)
+        if not WebAutomationSettings.is_configured():
+            print("⚠️ WARNING: Automatización web no está configurada")
     
     if errors:
         raise ValueError(f"Errores de configuración: {', '.join(errors)}")
     
+    if verbose:
+        print("✅ Configuraciones validadas correctamente")
+    
     return True
 
 
@@ -316,14 +386,6 @@ def print_configuration_status():
         print(f"  {key}: {'OK' if value else 'NO CONFIGURADO'}")
 
 
-# Validar al importar
-try:
-    validate_settings()
-    print("✅ Configuraciones validadas correctamente")
-except Exception as e:
-    print(f"❌ Error en configuraciones: {e}")
-
-
 # Exportar configuraciones principales
 __all__ = [
     'APISettings',
@@ -334,5 +396,7 @@ __all__ = [
     'LoggingSettings',
     'FileSettings',
     'SecuritySettings',
-    'PIXRPASettings'
+    'PIXRPASettings',
+    'ensure_directories',
+    'validate_settings'
 ]
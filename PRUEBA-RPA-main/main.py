@@ -9,8 +9,14 @@ Fecha: 2024-2025
 
 import os
 import sys
+import queue
+import functools
+import importlib.util
 import logging
-from datetime import datetime
+import logging.handlers
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any
 
@@ -26,17 +32,18 @@ except ImportError as e:
     print(f"❌ Error importando módulos principales: {e}")
     sys.exit(1)
 
-# Importar módulos extendidos
+# Importar módulos extendidos (OneDrive y Selenium se importan al ejecutar su paso)
 try:
-    from onedrive_client import OneDriveClient as OneDriveManager
-    from web_automation import WebFormAutomator as WebFormAutomation
-    from web_form_manager import upload_to_web_form
-    from config.settings import WebAutomationSettings
+    from config.settings import ExcelSettings, LoggingSettings, WebAutomationSettings, validate_settings
+    from utils.logger import gzip_namer, gzip_rotator
     from evidence_manager import EvidenceManager, initialize_evidence_manager
 except ImportError as e:
     print(f"❌ Error importando módulos extendidos: {e}")
     sys.exit(1)
 
+# Directorios ya verificados en este proceso (evita repetir mkdir en ejecuciones sucesivas)
+_DIRS_READY = set()
+
 
 class PIXRPAProcess:
     """Proceso principal PIX RPA"""
@@ -47,33 +54,63 @@ class PIXRPAProcess:
 
         # Inicializar gestores
         self.api_consumer = APIConsumer()
+        # Una sola conexión SQLite para todos los pasos (PRAGMAs y recuperación WAL una vez)
         self.db_manager = DatabaseManager()
         self.excel_generator = ExcelGenerator()
-        self.onedrive_manager = OneDriveManager()
-        self.web_automation = WebFormAutomation()
         self.evidence_manager = initialize_evidence_manager()
 
-        self.start_time = datetime.now()
+        # Flags de configuración resueltos una sola vez por instancia
+        self._onedrive_enabled = os.getenv("ONEDRIVE_ENABLED", "false").lower() == "true"
+        self._web_form_enabled = os.getenv("WEB_FORM_ENABLED", "false").lower() == "true"
+        self._web_form_url = os.getenv("WEB_FORM_URL")
+        self._web_native_configured = WebAutomationSettings.is_configured()
+
+        # Reloj monotónico: la duración no se ve afectada por ajustes del reloj del sistema
+        self._start_monotonic = time.monotonic()
         self.process_stats = {
             "productos_procesados": 0,
             "pasos_completados": 0,
-            "archivos_generados": [],
+            "archivos_generados": 0,
             "evidencias_capturadas": 0,
         }
+        # Ruta del último reporte Excel generado (lo reutilizan los pasos 4 y 5)
+        self.excel_path = None
+
+    @functools.cached_property
+    def onedrive_manager(self):
+        """Cliente OneDrive, creado al primer uso (msal solo se importa si el paso 4 lo necesita)"""
+        from onedrive_client import OneDriveClient
+        return OneDriveClient()
+
+    @functools.cached_property
+    def web_automation(self):
+        """
+        Automatizador web, creado al primer uso: Selenium/ChromeDriver solo se cargan si el paso 5
+        pasa la verificación de evidencia del día y la configuración nativa está habilitada
+        """
+        from web_automation import WebFormAutomator
+        return WebFormAutomator()
 
     def _setup_logging(self):
         """Configura el logging centralizado"""
         log_dir = "logs"
         os.makedirs(log_dir, exist_ok=True)
 
-        log_filename = f"pix_rpa_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-        log_filepath = os.path.join(log_dir, log_filename)
+        # Un único log rotativo: los archivos rotados se comprimen y se conservan LOG_MAX_FILES
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, "pix_rpa.log"),
+            maxBytes=LoggingSettings.MAX_BYTES,
+            backupCount=LoggingSettings.MAX_FILES,
+            encoding="utf-8",
+        )
+        file_handler.namer = gzip_namer
+        file_handler.rotator = gzip_rotator
 
         logging.basicConfig(
             level=logging.INFO,
             format="%(asctime)s | %(name)s | %(levelname)s | %(message)s",
             datefmt="%H:%M:%S",
-            handlers=[logging.FileHandler(log_filepath, encoding="utf-8"), logging.StreamHandler()],
+            handlers=[file_handler, logging.StreamHandler()],
         )
 
     def validate_environment(self) -> bool:
@@ -82,19 +119,31 @@ class PIXRPAProcess:
 
         # Crear templates de configuración si no existen
                 
+        # Validar configuraciones (crea directorios del proyecto y reporta opcionales)
+        try:
+            validate_settings(verbose=True)
+        except ValueError as e:
+            self.logger.error("  ✗ %s", e)
+            return False
+
         # Verificar directorios
         required_dirs = ["data", "reports", "logs", "evidencias", "config"]
-        for directory in required_dirs:
+        pending_dirs = [directory for directory in required_dirs if directory not in _DIRS_READY]
+        for directory in pending_dirs:
             os.makedirs(directory, exist_ok=True)
-            self.logger.info(f"  ✓ Directorio verificado: {directory}/")
-
-        # Verificar dependencias críticas
-        try:
-            import requests, pandas, openpyxl, sqlite3
-            self.logger.info("  ✓ Dependencias críticas verificadas")
-        except ImportError as e:
-            self.logger.error(f"  ✗ Dependencia faltante: {e}")
+            _DIRS_READY.add(directory)
+        if pending_dirs:
+            self.logger.info("  ✓ Directorios verificados: %s", ", ".join(pending_dirs))
+
+        # Verificar dependencias críticas sin importarlas (find_spec solo localiza el módulo)
+        missing = [
+            name for name in ("requests", ExcelSettings.ENGINE, "sqlite3")
+            if importlib.util.find_spec(name) is None
+        ]
+        if missing:
+            self.logger.error("  ✗ Dependencia faltante: %s", ", ".join(missing))
             return False
+        self.logger.info("  ✓ Dependencias críticas verificadas")
 
         return True
 
@@ -102,29 +151,84 @@ class PIXRPAProcess:
         """Paso 1: Consumo API pública"""
         self.logger.info("🚀 PASO 1: Consumo de API pública")
         productos, json_file = self.api_consumer.get_products()
-        self.process_stats["productos_procesados"] = len(productos)
-        self.process_stats["archivos_generados"].append(json_file)
-        # Evidencias
-        self.evidence_manager.capture_process_evidence("API_CONSUMPTION", True, {"count": len(productos)})
-        self.evidence_manager.capture_file_operation("JSON_BACKUP", json_file, True)
+        self._register_api_result(productos, json_file)
         return productos
 
     def step_2_database(self, productos):
         """Paso 2: Almacenamiento en BD"""
         self.logger.info("🚀 PASO 2: Almacenamiento en base de datos")
         inserted = self.db_manager.insert_products(productos)
-        self.logger.info(f"Productos insertados en BD: {inserted}")
+        self._register_db_result(inserted)
+        return inserted
+
+    def step_1_2_pipeline(self):
+        """Pasos 1 y 2 solapados: la descarga entrega lotes que se insertan mientras continúa"""
+        self.logger.info("🚀 PASOS 1-2: Consumo de API con inserción en BD por lotes")
+
+        # Productor (hilo) -> cola acotada -> consumidor (hilo principal, dueño de la conexión SQLite)
+        batches = queue.Queue(maxsize=2)
+        outcome = {}
+
+        def produce():
+            try:
+                outcome["result"] = self.api_consumer.get_products(on_batch=batches.put)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                batches.put(None)
+
+        producer = threading.Thread(target=produce, name="pix_rpa_api", daemon=True)
+        producer.start()
+
+        inserted = 0
+        try:
+            while (batch := batches.get()) is not None:
+                inserted += self.db_manager.insert_products(batch)
+        except Exception:
+            # Vaciar la cola para que el productor no quede bloqueado
+            while batches.get() is not None:
+                pass
+            raise
+        finally:
+            producer.join()
+
+        if "error" in outcome:
+            raise outcome["error"]
+
+        productos, json_file = outcome["result"]
+        self._register_api_result(productos, json_file)
+        self._register_db_result(inserted)
+        return productos
+
+    def _register_api_result(self, productos, json_file):
+        """Estadísticas y evidencias del paso 1"""
+        self.process_stats["productos_procesados"] = len(productos)
+        self._register_generated_file(json_file)
+        # Evidencias
+        self.evidence_manager.capture_process_evidence("API_CONSUMPTION", True, {"count": len(productos)})
+        self.evidence_manager.capture_file_operation("JSON_BACKUP", json_file, True)
+
+    def _register_generated_file(self, filepath):
+        """Anexa el archivo al diario de evidencias en vez de acumularlo en memoria"""
+        self.process_stats["archivos_generados"] += 1
+        self.evidence_manager.record_generated_file(filepath)
+
+    def _register_db_result(self, inserted):
+        """Log y evidencias del paso 2"""
+        self.logger.info("Productos insertados en BD: %d", inserted)
         # Evidencias
         self.evidence_manager.capture_process_evidence("DATABASE_INSERT", True, {"inserted": inserted})
-        return inserted
 
     def step_3_excel(self):
         """Paso 3: Generación reporte Excel"""
         self.logger.info("🚀 PASO 3: Generación de reporte Excel")
-        products = self.db_manager.get_all_products()
         statistics = self.db_manager.get_statistics()
+        # Iterador por lotes de tuplas (descripción ya recortada en SQLite): el reporte consume
+        # las filas sin cargar la tabla completa ni construir un dict por producto
+        products = self.db_manager.get_report_rows_iter()
         excel_path = self.excel_generator.generate_report(products, statistics)
-        self.process_stats["archivos_generados"].append(excel_path)
+        self.excel_path = excel_path
+        self._register_generated_file(excel_path)
         # Evidencias
         self.evidence_manager.capture_file_operation("EXCEL_REPORT", excel_path, True)
         return excel_path
@@ -134,7 +238,7 @@ class PIXRPAProcess:
         self.logger.info("🚀 PASO 4: Subida a OneDrive")
 
         # Respetar flag de configuración
-        if os.getenv("ONEDRIVE_ENABLED", "false").lower() != "true":
+        if not self._onedrive_enabled:
             self.logger.info("☁️ OneDrive deshabilitado por configuración, se omite")
             self.evidence_manager.capture_process_evidence("ONEDRIVE_UPLOAD", False, {"reason": "disabled"})
             return
@@ -153,20 +257,21 @@ class PIXRPAProcess:
         self.logger.info("🚀 PASO 5: Automatización web (formulario)")
 
         # Verificar si ya existe evidencia de formulario enviado hoy para evitar reenvío
-        from datetime import datetime
-        import os
-        evidencia_confirmacion = os.path.join("evidencias", "formulario_confirmacion.png")
-        if os.path.exists(evidencia_confirmacion):
-            mod_time = os.path.getmtime(evidencia_confirmacion)
-            mod_date = datetime.fromtimestamp(mod_time).date()
-            today = datetime.now().date()
-            if mod_date == today:
-                self.logger.info("⚠️ Evidencia de formulario ya existe para hoy, se omite reenvío automático")
-                self.evidence_manager.capture_process_evidence("WEB_FORM", True, {"file": excel_path, "mode": "skipped_duplicate"})
-                return
+        evidencia_confirmacion = os.path.join(
+            "evidencias", "formulario_confirmacion" + WebAutomationSettings.SCREENSHOT_EXTENSION
+        )
+        try:
+            mod_time = os.stat(evidencia_confirmacion).st_mtime
+        except FileNotFoundError:
+            mod_time = None
+        # Comparar (año, mes, día) en hora local sin construir objetos datetime/date
+        if mod_time is not None and time.localtime(mod_time)[:3] == time.localtime()[:3]:
+            self.logger.info("⚠️ Evidencia de formulario ya existe para hoy, se omite reenvío automático")
+            self.evidence_manager.capture_process_evidence("WEB_FORM", True, {"file": excel_path, "mode": "skipped_duplicate"})
+            return
 
         # Ruta A: configuración nativa (WebAutomationSettings)
-        if WebAutomationSettings.is_configured():
+        if self._web_native_configured:
             success = self.web_automation.submit_form(excel_path)
             self.evidence_manager.capture_process_evidence("WEB_FORM", bool(success), {"file": excel_path, "mode": "settings"})
             if not success:
@@ -174,10 +279,9 @@ class PIXRPAProcess:
             return
 
         # Ruta B: configuración por .env (WEB_FORM_ENABLED/WEB_FORM_URL)
-        env_enabled = os.getenv("WEB_FORM_ENABLED", "false").lower() == "true"
-        env_url = os.getenv("WEB_FORM_URL")
-        if env_enabled and env_url:
+        if self._web_form_enabled and self._web_form_url:
             self.logger.info("Usando WebFormManager basado en .env para envío de formulario")
+            from web_form_manager import upload_to_web_form
             success = upload_to_web_form(excel_path)
             self.evidence_manager.capture_process_evidence("WEB_FORM", bool(success), {"file": excel_path, "mode": "env"})
             if not success:
@@ -193,41 +297,64 @@ class PIXRPAProcess:
         """Paso 6: Evidencias finales"""
         self.logger.info("🚀 PASO 6: Registro de evidencias")
         path = self.evidence_manager.save_evidence_log(self.process_stats)
+        # El diario JSONL ya está en disco: solo falta sincronizarlo y cerrarlo
+        self.evidence_manager.close()
         if path:
-            self.logger.info(f"✅ Evidencias registradas en: {path}")
+            self.logger.info("✅ Evidencias registradas en: %s", path)
         else:
             self.logger.warning("⚠️ No fue posible guardar el log de evidencias")
 
     def run(self):
         """Ejecuta el proceso completo"""
-        if not self.validate_environment():
-            print("❌ Error validando entorno")
-            return False
-
         try:
-            productos = self.step_1_api()
-            self.step_2_database(productos)
+            if not self.validate_environment():
+                print("❌ Error validando entorno")
+                return False
+
+            self.step_1_2_pipeline()
             excel_path = self.step_3_excel()
-            self.step_4_onedrive(excel_path)
-            self.step_5_web(excel_path)
+            # Pasos 4 y 5 son independientes y limitados por red: se ejecutan en paralelo
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="pix_rpa") as executor:
+                futures = [
+                    executor.submit(self.step_4_onedrive, excel_path),
+                    executor.submit(self.step_5_web, excel_path),
+                ]
+            # Propagar el primer error en el mismo orden que la ejecución secuencial
+            for future in futures:
+                future.result()
             self.step_6_evidences()
             self.finalize()
             return True
         except Exception as e:
-            self.logger.error(f"❌ Error crítico en proceso: {str(e)}")
+            self.logger.error("❌ Error crítico en proceso: %s", e)
             return False
+        finally:
+            # También en error: no dejar Chrome/chromedriver ni la conexión SQLite abiertos
+            self.close()
 
     def finalize(self):
         """Finaliza con resumen"""
-        end_time = datetime.now()
-        duration = (end_time - self.start_time).total_seconds()
+        duration = time.monotonic() - self._start_monotonic
         self.logger.info("=" * 80)
         self.logger.info("PROCESO PIX RPA FINALIZADO")
-        self.logger.info(f"Tiempo total: {duration:.2f} seg")
-        self.logger.info(f"Productos procesados: {self.process_stats['productos_procesados']}")
-        self.logger.info(f"Archivos generados: {self.process_stats['archivos_generados']}")
+        self.logger.info("Tiempo total: %.2f seg", duration)
+        self.logger.info("Productos procesados: %d", self.process_stats["productos_procesados"])
+        self.logger.info(
+            "Archivos generados: %d (detalle en %s)",
+            self.process_stats["archivos_generados"], self.evidence_manager.journal_path,
+        )
         self.logger.info("=" * 80)
 
+    def close(self):
+        """Libera los recursos del proceso (idempotente; se llama desde el finally de run)"""
+        # Diario de evidencias: el paso 6 lo cierra, pero una ejecución parcial o fallida no pasa por él
+        self.evidence_manager.close()
+        # Conexión única del proceso: se cierra solo al terminar
+        self.db_manager.close()
+        # El navegador se mantiene abierto entre envíos; cerrarlo solo si llegó a crearse
+        if "web_automation" in self.__dict__:
+            self.web_automation.close()
+
 
 def main():
     process = PIXRPAProcess()
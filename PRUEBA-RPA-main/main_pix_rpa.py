@@ -22,6 +22,10 @@ if str(PROJECT_ROOT) not in sys.path:
 from main import PIXRPAProcess  # noqa: E402
 
 
+# Pasos válidos del proceso (1..6)
+_VALID_STEPS = frozenset(range(1, 7))
+
+
 def parse_steps(steps_arg: str):
     """Convierte el argumento --steps en una lista ordenada de enteros únicos.
     Admite formatos "1,2,3" o "123".
@@ -31,17 +35,24 @@ def parse_steps(steps_arg: str):
     # Normalizar
     s = steps_arg.replace(" ", "")
     parts = s.split(",") if "," in s else list(s)
-    steps = []
+    steps = set()
     for p in parts:
         if not p:
             continue
         try:
-            val = int(p)
-            if val in range(1, 7) and val not in steps:
-                steps.append(val)
+            steps.add(int(p))
         except ValueError:
             continue
-    return sorted(steps)
+    # Unicidad por el set; la intersección descarta pasos fuera de rango
+    return sorted(steps & _VALID_STEPS)
+
+
+def _get_excel_path(process):
+    """Retorna el reporte Excel ya generado en esta ejecución o lo genera (paso 3)"""
+    if process.excel_path is not None:
+        process.logger.info("♻️ Reutilizando reporte Excel: %s", process.excel_path)
+        return process.excel_path
+    return process.step_3_excel()
 
 
 def run_selected_steps(steps):
@@ -49,7 +60,16 @@ def run_selected_steps(steps):
     Maneja dependencias entre pasos (productos para 2, excel_path para 4/5).
     """
     process = PIXRPAProcess()
+    try:
+        return _run_steps(process, steps)
+    finally:
+        # También en error: no dejar Chrome/chromedriver ni la conexión SQLite abiertos
+        process.close()
+
 
+def _run_steps(process, steps):
+    """Cuerpo de run_selected_steps; los recursos del proceso los libera el llamador"""
+    # Validar antes de cualquier descarga: un entorno inválido no debe recibir respaldos JSON
     if not process.validate_environment():
         print("❌ Error validando entorno")
         return 1
@@ -70,7 +90,7 @@ def run_selected_steps(steps):
             print("✅ Proceso completado exitosamente")
             return 0
         except Exception as e:
-            process.logger.error(f"❌ Error crítico en proceso: {e}")
+            process.logger.error("❌ Error crítico en proceso: %s", e)
             print("❌ Proceso completado con errores")
             return 1
 
@@ -86,14 +106,13 @@ def run_selected_steps(steps):
                 process.step_2_database(productos)
             elif step == 3:
                 excel_path = process.step_3_excel()
-            elif step == 4:
-                if excel_path is None:
-                    excel_path = process.step_3_excel()
-                process.step_4_onedrive(excel_path)
-            elif step == 5:
-                if excel_path is None:
-                    excel_path = process.step_3_excel()
-                process.step_5_web(excel_path)
+            elif step in (4, 5):
+                # Sin paso 3 previo, el reporte se genera una sola vez y lo comparten 4 y 5
+                excel_path = _get_excel_path(process)
+                if step == 4:
+                    process.step_4_onedrive(excel_path)
+                else:
+                    process.step_5_web(excel_path)
             elif step == 6:
                 process.step_6_evidences()
 
@@ -101,7 +120,7 @@ def run_selected_steps(steps):
         print("✅ Pasos seleccionados completados")
         return 0
     except Exception as e:
-        process.logger.error(f"❌ Error ejecutando pasos {steps}: {e}")
+        process.logger.error("❌ Error ejecutando pasos %s: %s", steps, e)
         print("❌ Ejecución con errores")
         return 1
 
@@ -1,19 +1,53 @@
 """
 Módulos principales del proceso RPA
+
+Las clases se resuelven de forma diferida (PEP 562): importar el paquete no carga
+Selenium, openpyxl ni msal hasta que se accede a la clase que los necesita.
 """
 
-from .database_manager import DatabaseManager
-from .excel_generator import ExcelReportGenerator
-from .onedrive_client import OneDriveClient
-from .web_automation import WebFormAutomator
+import importlib
+
+# Nombre público -> submódulo que lo define
+_LAZY = {
+    'FakeStoreAPIConsumer': 'api_consumer',
+    'AsyncFakeStoreAPIConsumer': 'api_consumer',
+    'Product': 'api_consumer',
+    'DatabaseManager': 'database_manager',
+    'ExcelReportGenerator': 'excel_generator',
+    'OneDriveClient': 'onedrive_client',
+    'WebFormAutomator': 'web_automation',
+    'WebFormManager': 'web_form_manager',
+    'EvidenceManager': 'evidence_manager',
+}
 
 __all__ = [
     'DatabaseManager',
-    'ExcelReportGenerator', 
+    'ExcelReportGenerator',
     'OneDriveClient',
-    'WebFormAutomator'
+    'WebFormAutomator',
+    'FakeStoreAPIConsumer',
+    'AsyncFakeStoreAPIConsumer',
+    'Product',
+    'WebFormManager',
+    'EvidenceManager',
 ]
 
 __version__ = '1.0.0'
 __author__ = 'PIX RPA Development Team'
 __description__ = 'Módulos para análisis automatizado de productos'
+
+
+def __getattr__(name):
+    """Importa el submódulo correspondiente en el primer acceso al atributo"""
+    try:
+        module_name = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # Cachear en el namespace del paquete: los accesos siguientes no pasan por __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
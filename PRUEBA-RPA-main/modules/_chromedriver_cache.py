@@ -0,0 +1,169 @@
+"""
+Caché en disco de la ruta de ChromeDriver
+
+Selenium Manager resuelve ChromeDriver en cada proceso (consulta su caché y, a veces, la
+red). La ruta resuelta se guarda junto con la versión de Chrome para que los procesos
+siguientes arranquen el driver directamente. Si la versión mayor del Chrome instalado ya no
+coincide con la guardada, la caché se descarta antes de lanzar el driver; si aun así la
+sesión no se crea (versión no detectable), se descarta y se resuelve de nuevo.
+
+Además, el cliente HTTP del driver se amplía a POOL_MAXSIZE conexiones con ChromeDriver
+para que comandos simultáneos (p. ej. screenshot mientras se espera un elemento) no se
+serialicen sobre una sola conexión.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+CACHE_PATH = Path(os.getenv('WEBDRIVER_PATH_CACHE', str(Path.home() / '.cache' / 'rpa' / 'chromedriver.json')))
+
+# Ejecutables de Chrome/Chromium que se buscan en el PATH (Linux, macOS vía PATH y Windows)
+CHROME_EXECUTABLES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome', 'chrome.exe')
+
+# Conexiones keep-alive simultáneas hacia ChromeDriver (urllib3 usa 1 por defecto)
+POOL_MAXSIZE = int(os.getenv('WEBDRIVER_POOL_MAXSIZE', 10))
+
+logger = logging.getLogger('ChromeDriverCache')
+
+
+def _major(version: Optional[str]) -> Optional[str]:
+    """Versión mayor ('120' de '120.0.6099.109'); ChromeDriver es compatible por versión mayor"""
+    return version.split('.', 1)[0] if version else None
+
+
+def installed_chrome_version() -> Optional[str]:
+    """
+    Versión del Chrome instalado según `<ejecutable> --version`
+
+    Returns:
+        Optional[str]: Versión (p. ej. '120.0.6099.109') o None si no se encuentra o no la
+            informa (en Windows chrome.exe no imprime la versión)
+    """
+    executable = next(filter(None, map(shutil.which, CHROME_EXECUTABLES)), None)
+    if not executable:
+        return None
+    try:
+        output = subprocess.run(
+            [executable, '--version'], capture_output=True, text=True, timeout=5
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'\d+(?:\.\d+)+', output)
+    return match.group(0) if match else None
+
+
+def load_driver_path() -> Optional[str]:
+    """
+    Lee la ruta de ChromeDriver guardada por un proceso anterior
+
+    Returns:
+        Optional[str]: Ruta del ejecutable si sigue existiendo y corresponde a la versión mayor
+            del Chrome instalado, None si no hay caché válida
+    """
+    try:
+        entry = json.loads(CACHE_PATH.read_text(encoding='utf-8'))
+        path = entry.get('path')
+        cached_version = entry.get('browser_version')
+    except (OSError, ValueError, AttributeError):
+        return None
+    if not path or not os.path.isfile(path):
+        return None
+
+    installed_major = _major(installed_chrome_version())
+    if installed_major and cached_version and installed_major != _major(cached_version):
+        # Chrome se actualizó: el driver guardado ya no sirve, evitar un arranque fallido
+        logger.info(
+            "Chrome %s instalado; ChromeDriver en caché era para %s, se resuelve de nuevo",
+            installed_major, cached_version,
+        )
+        CACHE_PATH.unlink(missing_ok=True)
+        return None
+    return path
+
+
+def store_driver_path(driver) -> Optional[str]:
+    """
+    Guarda la ruta del ChromeDriver en uso y la versión de Chrome que lo aceptó
+
+    Args:
+        driver: Driver de Chrome ya iniciado
+
+    Returns:
+        Optional[str]: Ruta del ejecutable de ChromeDriver
+    """
+    path = driver.service.path
+    entry = {'path': path, 'browser_version': driver.capabilities.get('browserVersion')}
+    try:
+        if CACHE_PATH.exists() and json.loads(CACHE_PATH.read_text(encoding='utf-8')) == entry:
+            return path
+    except (OSError, ValueError):
+        pass
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        CACHE_PATH.write_text(json.dumps(entry), encoding='utf-8')
+    except (OSError, TypeError) as e:
+        logger.debug("No se pudo guardar la caché de ChromeDriver: %s", e)
+    return path
+
+
+def _widen_command_pool(driver) -> None:
+    """
+    Amplía el pool urllib3 del ejecutor de comandos del driver
+
+    Selenium crea el PoolManager con maxsize=1 y no permite ajustarlo desde webdriver.Chrome
+    en todas las versiones; se cambian sus parámetros y se descarta el pool ya creado para
+    que el siguiente comando abra uno nuevo con POOL_MAXSIZE conexiones.
+    """
+    # Internos de Selenium/urllib3: si no tienen la forma esperada se deja el pool como está
+    executor = getattr(driver, 'command_executor', None)
+    conn = getattr(executor, '_conn', None)
+    pool_kw = getattr(conn, 'connection_pool_kw', None)
+    clear = getattr(conn, 'clear', None)
+    if not isinstance(pool_kw, dict) or not callable(clear):
+        # Sin keep-alive (_conn ausente) o versión de Selenium/urllib3 con otra estructura
+        logger.debug("Pool de comandos del driver sin ajustar: %s", type(conn).__name__)
+        return
+    try:
+        pool_kw['maxsize'] = POOL_MAXSIZE
+        clear()
+    except Exception as e:
+        logger.debug("No se pudo ampliar el pool de comandos del driver: %s", e)
+
+
+def start_chrome(options, driver_path: Optional[str] = None):
+    """
+    Crea un driver de Chrome reutilizando la ruta de ChromeDriver conocida
+
+    Args:
+        options: Opciones de Chrome
+        driver_path: Ruta ya resuelta en este proceso (si es None se consulta la caché en disco)
+
+    Returns:
+        WebDriver: Driver iniciado con el pool de conexiones ampliado; su ruta queda
+            guardada para los siguientes procesos
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.common.exceptions import WebDriverException
+
+    driver = None
+    driver_path = driver_path or load_driver_path()
+    if driver_path:
+        try:
+            driver = webdriver.Chrome(service=Service(driver_path), options=options)
+        except WebDriverException as e:
+            # Driver incompatible con el Chrome instalado (p. ej. tras una actualización)
+            logger.info("ChromeDriver en caché no válido, se resuelve de nuevo: %s", e.msg)
+            CACHE_PATH.unlink(missing_ok=True)
+
+    if driver is None:
+        driver = webdriver.Chrome(service=Service(), options=options)
+    store_driver_path(driver)
+    _widen_command_pool(driver)
+    return driver
@@ -0,0 +1,61 @@
+"""
+Normalización de productos a filas para executemany
+
+Módulo sin dependencias del proyecto y con anotaciones completas para poder compilarlo
+con mypyc (`mypyc modules/_fast_normalize.py`). Si existe la extensión compilada junto al
+fuente, Python la importa en su lugar; si no, se usa este mismo código interpretado.
+"""
+
+from datetime import datetime
+from typing import Any, Iterable, List, Tuple
+
+FECHA_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+Row = Tuple[int, str, float, str, str, str]
+
+
+def normalize_rows(products: Iterable[Any], default_fecha: str) -> Tuple[List[Row], List[Tuple[Any, str]]]:
+    """
+    Convierte productos (dict o Product con as_dict()) en tuplas listas para INSERT.
+
+    Args:
+        products: Productos con campos id, title, price, category, description, fecha_insercion
+        default_fecha: Fecha (ya formateada) para productos sin fecha_insercion
+
+    Returns:
+        Tuple: (filas válidas, [(id, motivo)] de los productos omitidos)
+    """
+    rows: List[Row] = []
+    skipped: List[Tuple[Any, str]] = []
+    append = rows.append
+    # El consumidor de API comparte un mismo datetime para todo el lote: formatearlo una vez
+    last_fecha: Any = None
+    last_fecha_str = default_fecha
+
+    for p in products:
+        # Los productos del consumidor de API llegan como Product
+        if hasattr(p, "as_dict"):
+            p = p.as_dict()
+        try:
+            # Normalizar y validar datos mínimos
+            pid = int(p["id"])  # lanza si no convertible
+            title = str(p.get("title", "")).strip()
+            price = float(p.get("price", 0))
+            category = str(p.get("category", "")).strip()
+            description = str(p.get("description", "")).strip()
+            fecha = p.get("fecha_insercion")
+            if isinstance(fecha, datetime):
+                if fecha is not last_fecha:
+                    last_fecha = fecha
+                    last_fecha_str = fecha.strftime(FECHA_FORMAT)
+                fecha_str = last_fecha_str
+            else:
+                # Si viene como string o None, forzar a ahora si vacío
+                fecha_str = str(fecha) if fecha else default_fecha
+
+            append((pid, title, price, category, description, fecha_str))
+
+        except (ValueError, TypeError, KeyError) as ve:
+            skipped.append((p.get("id", "unknown"), str(ve)))
+
+    return rows, skipped
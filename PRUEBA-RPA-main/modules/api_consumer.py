@@ -1,5 +1,5 @@
 """
-Wrapper para exponer FakeStoreAPIConsumer dentro del paquete 'modules'.
+Wrapper para exponer FakeStoreAPIConsumer (y su variante asíncrona) dentro del paquete 'modules'.
 Reexporta la implementación real ubicada en el archivo raíz 'api_consumer.py'.
 """
 
@@ -12,7 +12,7 @@ _PROJECT_ROOT = _CURRENT_DIR.parent
 if str(_PROJECT_ROOT) not in sys.path:
     sys.path.append(str(_PROJECT_ROOT))
 
-# Reexportar la clase desde el módulo real
-from api_consumer import FakeStoreAPIConsumer  # noqa: E402,F401
+# Reexportar las clases desde el módulo real
+from api_consumer import FakeStoreAPIConsumer, AsyncFakeStoreAPIConsumer, Product  # noqa: E402,F401
 
-__all__ = ["FakeStoreAPIConsumer"]
+__all__ = ["FakeStoreAPIConsumer", "AsyncFakeStoreAPIConsumer", "Product"]
@@ -5,24 +5,61 @@ Soporta inserción sin duplicados y consultas para reportes
 
 from __future__ import annotations
 
+import gc
+import logging
 import sqlite3
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 
 from config.settings import DatabaseSettings
 from utils.logger import setup_logger
 
+# Importable como modules.database_manager o como database_manager (modules/ en sys.path)
+try:
+    from ._fast_normalize import FECHA_FORMAT, normalize_rows
+except ImportError:
+    from _fast_normalize import FECHA_FORMAT, normalize_rows
+
 
 class DatabaseManager:
     """Gestor de base de datos SQLite para Productos"""
 
+    # Índices secundarios de Productos: (nombre, columna)
+    SECONDARY_INDEXES = (
+        ("idx_category", "category"),
+        ("idx_fecha_insercion", "fecha_insercion"),
+        ("idx_price", "price"),
+    )
+
+    # Una instancia (y conexión) por archivo de BD durante la vida del proceso RPA
+    _instances: Dict[Path, "DatabaseManager"] = {}
+    _instances_lock = threading.Lock()
+
+    def __new__(cls, db_path: Optional[str] = None):
+        key = cls._resolve_path(db_path)
+        with cls._instances_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = super().__new__(cls)
+                cls._instances[key] = instance
+            return instance
+
     def __init__(self, db_path: Optional[str] = None):
+        # Instancia reutilizada: PRAGMAs, recuperación WAL y esquema ya aplicados
+        if getattr(self, "conn", None) is not None:
+            return
         self.logger = setup_logger("DatabaseManager")
-        self.db_path = Path(db_path) if db_path else Path(DatabaseSettings.get_connection_string())
+        self.db_path = self._resolve_path(db_path)
         self._connect()
         self._initialize_database()
 
+    @staticmethod
+    def _resolve_path(db_path: Optional[str]) -> Path:
+        """Ruta absoluta de la BD (clave del registro de instancias)"""
+        return Path(db_path).resolve() if db_path else Path(DatabaseSettings.get_connection_string())
+
     def _connect(self):
         """Establece la conexión a la base de datos y aplica PRAGMAs"""
         try:
@@ -30,7 +67,9 @@ class DatabaseManager:
                 str(self.db_path),
                 timeout=DatabaseSettings.TIMEOUT,
                 isolation_level=DatabaseSettings.ISOLATION_LEVEL,
-                detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                # Sin conversores registrados ni tipos DATE/TIMESTAMP: no analizar tipos por columna
+                detect_types=0,
+                cached_statements=DatabaseSettings.CACHED_STATEMENTS,
             )
             self.conn.row_factory = sqlite3.Row
 
@@ -39,9 +78,12 @@ class DatabaseManager:
             cur.execute(f"PRAGMA journal_mode={DatabaseSettings.JOURNAL_MODE}")
             cur.execute(f"PRAGMA synchronous={DatabaseSettings.SYNCHRONOUS}")
             cur.execute(f"PRAGMA cache_size={DatabaseSettings.CACHE_SIZE}")
+            cur.execute(f"PRAGMA temp_store={DatabaseSettings.TEMP_STORE}")
+            cur.execute(f"PRAGMA mmap_size={DatabaseSettings.MMAP_SIZE}")
+            cur.execute(f"PRAGMA wal_autocheckpoint={DatabaseSettings.WAL_AUTOCHECKPOINT}")
             cur.close()
 
-            self.logger.info("✅ Conexión a BD establecida", {"db_path": str(self.db_path)})
+            self.logger.info("✅ Conexión a BD establecida", extra_data={"db_path": str(self.db_path)})
         except Exception as e:
             self.logger.error(f"Error conectando a BD: {e}")
             raise
@@ -63,9 +105,7 @@ class DatabaseManager:
                 self.conn.execute(create_table_sql)
 
                 # Crear índices para optimizar consultas
-                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_category ON Productos(category)")
-                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_fecha_insercion ON Productos(fecha_insercion)")
-                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_price ON Productos(price)")
+                self._create_indexes()
 
             self.logger.info("🗄️  Tabla 'Productos' verificada/creada con índices optimizados")
         except Exception as e:
@@ -76,7 +116,8 @@ class DatabaseManager:
         """Inserta productos evitando duplicados por clave primaria id con manejo robusto de concurrencia
 
         Args:
-            products: Lista de productos con campos id, title, price, category, description, fecha_insercion
+            products: Lista de productos (dict o Product con as_dict()) con campos id, title, price,
+                category, description, fecha_insercion
         Returns:
             int: cantidad insertada efectivamente (excluye ignorados por duplicado)
         """
@@ -88,44 +129,32 @@ class DatabaseManager:
             " VALUES (?, ?, ?, ?, ?, ?)"
         )
 
-        inserted = 0
+        # Sin GC cíclico durante la carga: las miles de tuplas nuevas no tienen ciclos y las
+        # recolecciones intermedias solo añaden pausas dentro de la transacción
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
         try:
-            # Usar bloqueo explícito para concurrencia
+            # Normalizar fuera de la transacción para mantener el lock de escritura el menor tiempo posible
+            rows = self._prepare_insert_rows(products)
+
+            # isolation_level=IMMEDIATE: el primer INSERT abre la transacción de escritura y
+            # el context manager confirma o revierte al salir
             with self.conn:
-                # Adquirir lock exclusivo para escritura
-                self.conn.execute("BEGIN EXCLUSIVE")
-
-                for p in products:
-                    try:
-                        # Normalizar y validar datos mínimos
-                        pid = int(p["id"])  # lanza si no convertible
-                        title = str(p.get("title", "")).strip()
-                        price = float(p.get("price", 0))
-                        category = str(p.get("category", "")).strip()
-                        description = str(p.get("description", "")).strip()
-                        fecha = p.get("fecha_insercion")
-                        if isinstance(fecha, datetime):
-                            fecha_str = fecha.strftime("%Y-%m-%d %H:%M:%S")
-                        else:
-                            # Si viene como string o None, forzar a ahora si vacío
-                            fecha_str = str(fecha) if fecha else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                        cur = self.conn.execute(insert_sql, (pid, title, price, category, description, fecha_str))
-                        # rowcount es 1 si insertó, 0 si ignorado
-                        if cur.rowcount == 1:
-                            inserted += 1
-
-                    except (ValueError, TypeError) as ve:
-                        self.logger.warning(f"Producto inválido omitido (id: {p.get('id', 'unknown')}): {ve}")
-                        continue
-                    except Exception as pe:
-                        self.logger.error(f"Error procesando producto individual: {pe}")
-                        # Rollback de la transacción completa en error crítico
-                        self.conn.rollback()
-                        raise
-
-                # Commit explícito
-                self.conn.commit()
+                # En cargas masivas es más barato reconstruir los índices que mantenerlos fila a fila
+                rebuild_indexes = len(rows) >= DatabaseSettings.INDEX_REBUILD_THRESHOLD
+                if rebuild_indexes:
+                    # El DDL no abre transacción implícita: iniciarla para que el DROP sea atómico con el insert
+                    self.conn.execute("BEGIN IMMEDIATE")
+                    self._drop_indexes()
+
+                # Un único executemany dentro de la transacción (un solo fsync al confirmar)
+                changes_before = self.conn.total_changes
+                self.conn.executemany(insert_sql, rows)
+                # total_changes no cuenta las filas ignoradas por duplicado
+                inserted = self.conn.total_changes - changes_before
+
+                if rebuild_indexes:
+                    self._create_indexes()
 
             self.logger.log_db_operation(
                 "INSERT_PRODUCTS",
@@ -143,26 +172,106 @@ class DatabaseManager:
             except:
                 pass
             raise
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _create_indexes(self):
+        """Crea los índices secundarios de Productos si no existen"""
+        for name, column in self.SECONDARY_INDEXES:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON Productos({column})")
+
+    def _drop_indexes(self):
+        """Elimina los índices secundarios (se recrean en la misma transacción)"""
+        for name, _column in self.SECONDARY_INDEXES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def _prepare_insert_rows(self, products: List[Dict[str, Any]]) -> List[tuple]:
+        """Normaliza y valida los productos como tuplas para executemany, omitiendo los inválidos"""
+        # Fecha por defecto formateada una sola vez por lote
+        default_fecha = datetime.now().strftime(FECHA_FORMAT)
+        rows, skipped = normalize_rows(products, default_fecha)
+
+        if skipped:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for pid, reason in skipped:
+                    self.logger.debug("Producto inválido omitido (id: %s): %s", pid, reason)
+            # Un único aviso por lote en lugar de uno por fila inválida
+            self.logger.warning(
+                "Productos inválidos omitidos: %d (ids: %s)", len(skipped), [pid for pid, _ in skipped]
+            )
+
+        return rows
 
     def get_all_products(self) -> List[Dict[str, Any]]:
         """Retorna todos los productos ordenados por id"""
         try:
             sql = "SELECT id, title, price, category, description, fecha_insercion FROM Productos ORDER BY id"
             cur = self.conn.execute(sql)
+            # sqlite3.Row ya expone el mapeo columna→valor: dict() lo convierte sin nombrar cada clave
+            return [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            self.logger.error(f"Error consultando productos: {e}")
+            raise
+
+    def get_all_products_columns(self) -> Dict[str, list]:
+        """Retorna los productos ordenados por id en formato columnar ({columna: [valores]})
+
+        Returns:
+            Dict[str, list]: Una lista por columna, apta para pd.DataFrame(dict) sin conversión por fila
+        """
+        try:
+            cur = self.conn.execute(
+                "SELECT id, title, price, category, description, fecha_insercion FROM Productos ORDER BY id"
+            )
+            names = [d[0] for d in cur.description]
             rows = cur.fetchall()
-            # Convertir a dicts
-            products = [
-                {
-                    "id": row["id"],
-                    "title": row["title"],
-                    "price": row["price"],
-                    "category": row["category"],
-                    "description": row["description"],
-                    "fecha_insercion": row["fecha_insercion"],
-                }
-                for row in rows
-            ]
-            return products
+            # Transponer filas a columnas en una sola pasada
+            columns = zip(*rows) if rows else ([] for _ in names)
+            return {name: list(values) for name, values in zip(names, columns)}
+        except Exception as e:
+            self.logger.error(f"Error consultando productos: {e}")
+            raise
+
+    def get_all_products_iter(self, batch: int = 5000) -> Iterator[Dict[str, Any]]:
+        """Genera los productos ordenados por id leyendo en lotes de `batch` filas (sin materializar la tabla)"""
+        try:
+            sql = "SELECT id, title, price, category, description, fecha_insercion FROM Productos ORDER BY id"
+            cur = self.conn.execute(sql)
+            try:
+                while rows := cur.fetchmany(batch):
+                    yield from map(dict, rows)
+            finally:
+                cur.close()
+        except Exception as e:
+            self.logger.error(f"Error consultando productos: {e}")
+            raise
+
+    def get_report_rows_iter(self, batch: int = 5000) -> Iterator[tuple]:
+        """Genera filas listas para el reporte Excel como tuplas, leyendo en lotes de `batch` filas
+
+        La descripción se recorta a 100 caracteres (+ '...') dentro de SQLite, por lo que no hay
+        ramas ni dicts por fila en Python.
+
+        Returns:
+            Iterator[tuple]: (id, title, price, category, descripción recortada, fecha_insercion)
+        """
+        sql = (
+            "SELECT id, title, price, category,"
+            " CASE WHEN length(description) > 100"
+            " THEN substr(description, 1, 100) || '...' ELSE description END,"
+            " fecha_insercion FROM Productos ORDER BY id"
+        )
+        try:
+            cur = self.conn.cursor()
+            # Tuplas planas en lugar de sqlite3.Row
+            cur.row_factory = None
+            cur.execute(sql)
+            try:
+                while rows := cur.fetchmany(batch):
+                    yield from rows
+            finally:
+                cur.close()
         except Exception as e:
             self.logger.error(f"Error consultando productos: {e}")
             raise
@@ -176,18 +285,12 @@ class DatabaseManager:
                 "category_stats": [],
             }
 
-            # Totales
-            cur = self.conn.execute("SELECT COUNT(*) AS cnt, AVG(price) AS avg_price FROM Productos")
-            row = cur.fetchone()
-            if row:
-                stats["total_products"] = int(row["cnt"]) if row["cnt"] is not None else 0
-                stats["avg_price"] = float(row["avg_price"]) if row["avg_price"] is not None else 0.0
-
-            # Por categoría
+            # Un único recorrido de la tabla: los totales se derivan de los agregados por categoría
             cur = self.conn.execute(
                 """
                 SELECT category,
                        COUNT(*)           AS count,
+                       SUM(price)         AS sum_price,
                        AVG(price)         AS avg_price,
                        MIN(price)         AS min_price,
                        MAX(price)         AS max_price
@@ -208,6 +311,12 @@ class DatabaseManager:
                 for r in rows
             ]
 
+            # Totales
+            total = sum(c["count"] for c in stats["category_stats"])
+            if total:
+                stats["total_products"] = total
+                stats["avg_price"] = float(sum(r["sum_price"] or 0.0 for r in rows)) / total
+
             return stats
         except Exception as e:
             self.logger.error(f"Error calculando estadísticas: {e}")
@@ -233,15 +342,12 @@ class DatabaseManager:
             if cur.fetchone():
                 health["table_exists"] = True
 
-                # Contar registros
-                cur = self.conn.execute("SELECT COUNT(*) as count FROM Productos")
-                row = cur.fetchone()
-                health["record_count"] = row["count"] if row else 0
-
-                # Última inserción
-                cur = self.conn.execute("SELECT MAX(fecha_insercion) as last FROM Productos")
-                row = cur.fetchone()
-                health["last_insert"] = row["last"] if row and row["last"] else None
+                # Contar registros y última inserción en una sola consulta (acceso posicional)
+                count, last = self.conn.execute(
+                    "SELECT COUNT(*), MAX(fecha_insercion) FROM Productos"
+                ).fetchone()
+                health["record_count"] = count or 0
+                health["last_insert"] = last or None
 
             # Verificar integridad
             cur = self.conn.execute("PRAGMA integrity_check")
@@ -259,11 +365,17 @@ class DatabaseManager:
 
     def close(self):
         try:
-            if hasattr(self, "conn") and self.conn:
+            if getattr(self, "conn", None) is not None:
                 self.conn.close()
+                self.conn = None
                 self.logger.debug("Conexión a BD cerrada")
         except Exception:
             pass
+        finally:
+            # Una construcción posterior vuelve a abrir la conexión
+            with self._instances_lock:
+                if self._instances.get(getattr(self, "db_path", None)) is self:
+                    del self._instances[self.db_path]
 
     # Soporte de context manager
     def __enter__(self) -> "DatabaseManager":
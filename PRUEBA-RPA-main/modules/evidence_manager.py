@@ -1,16 +1,20 @@
 """
 Gestor de evidencias para el proceso RPA
-Registra eventos, operaciones de archivos y genera un log consolidado en JSON
+Registra eventos, operaciones de archivos y genera un log consolidado en JSON.
+Cada registro se anexa además a un diario JSONL del día (evidencias/run_YYYYMMDD.jsonl)
+en el momento en que ocurre, de modo que una caída a mitad de proceso no pierde evidencias.
 """
 
 from __future__ import annotations
 
 import os
-import json
-from dataclasses import dataclass, asdict
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
 from datetime import datetime
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import orjson
 
 from config.settings import EVIDENCES_DIR, FileSettings, LOGS_DIR
 from utils.logger import setup_logger
@@ -29,7 +33,7 @@ class FileEvidence:
     timestamp: str
     operation: str
     filepath: str
-    exists: bool
+    exists: Optional[bool]  # None mientras el stat está pendiente
     file_size: Optional[int]
     success: bool
     extra: Optional[Dict[str, Any]] = None
@@ -46,6 +50,59 @@ class EvidenceManager:
         self.started_at = datetime.now()
         self.events: List[EvidenceEvent] = []
         self.files: List[FileEvidence] = []
+        # Registros cuyo exists/file_size se resuelve en lote al guardar el log
+        self._pending_stats: Deque[FileEvidence] = deque()
+
+        # Diario append-only: una línea JSON por evidencia, escrita al momento
+        journal_name = (
+            f"{FileSettings.EVIDENCE_JOURNAL_PREFIX}"
+            f"{self.started_at.strftime(FileSettings.JOURNAL_DATE_FORMAT)}"
+            f"{FileSettings.JSONL_EXTENSION}"
+        )
+        self.journal_path = EVIDENCES_DIR / journal_name
+        # Binario: orjson produce bytes UTF-8 listos para escribir
+        self._journal_fp = open(self.journal_path, "ab")
+        # Los pasos 4 y 5 corren en hilos distintos: una línea por escritura, sin intercalar
+        self._journal_lock = threading.Lock()
+
+    def _journal(self, event: str, record: Dict[str, Any]):
+        """
+        Anexa una línea al diario JSONL de evidencias.
+
+        Args:
+            event: Tipo de registro (process, file, file_generated, ...)
+            record: Campos serializables del registro
+        """
+        line = orjson.dumps({"event": event, **record}, default=str) + b"\n"
+        try:
+            with self._journal_lock:
+                if self._journal_fp is None or self._journal_fp.closed:
+                    return
+                self._journal_fp.write(line)
+                self._journal_fp.flush()
+        except Exception as e:
+            self.logger.warning("No se pudo escribir en el diario de evidencias: %s", e)
+
+    def record_generated_file(self, filepath: str):
+        """Registra en el diario un archivo generado por el proceso"""
+        self._journal("file_generated", {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "path": str(filepath),
+        })
+
+    def close(self):
+        """Sincroniza a disco y cierra el diario de evidencias (idempotente)"""
+        # Una ejecución que no llegó a save_evidence_log deja stats pendientes: resolverlos antes
+        self._resolve_pending_stats()
+        with self._journal_lock:
+            fp = self._journal_fp
+            if fp is None or fp.closed:
+                return
+            try:
+                fp.flush()
+                os.fsync(fp.fileno())
+            finally:
+                fp.close()
 
     # Eventos de proceso (pasos, acciones lógicas)
     def capture_process_evidence(self, stage: str, success: bool, metadata: Optional[Dict[str, Any]] = None):
@@ -56,7 +113,8 @@ class EvidenceManager:
             metadata=metadata or {}
         )
         self.events.append(event)
-        self.logger.info(f"EVIDENCE EVENT: {stage} | success={success}", metadata)
+        self._journal("process", vars(event))
+        self.logger.info("EVIDENCE EVENT: %s | success=%s", stage, success, extra_data=metadata)
 
     # Operaciones de archivos (Excel, JSON, screenshots, etc.)
     def capture_file_operation(
@@ -64,15 +122,11 @@ class EvidenceManager:
         operation: str,
         filepath: str,
         success: bool,
-        extra: Optional[Dict[str, Any]] = None
+        extra: Optional[Dict[str, Any]] = None,
+        file_size: Optional[int] = None
     ):
-        try:
-            p = Path(filepath)
-            exists = p.exists()
-            file_size = p.stat().st_size if exists else None
-        except Exception:
-            exists = False
-            file_size = None
+        # Tamaño ya conocido (p. ej. por os.scandir); si no, se resuelve en lote al guardar el log
+        exists = True if file_size is not None else None
 
         record = FileEvidence(
             timestamp=datetime.now().isoformat(timespec="seconds"),
@@ -84,33 +138,97 @@ class EvidenceManager:
             extra=extra or {}
         )
         self.files.append(record)
+        if exists is None:
+            self._pending_stats.append(record)
+        self._journal("file", vars(record))
         self.logger.info(
-            f"EVIDENCE FILE: {operation} | {p.name if 'p' in locals() else filepath} | success={success}",
-            {"exists": exists, "file_size": file_size}
+            "EVIDENCE FILE: %s | %s | success=%s",
+            operation, os.path.basename(filepath), success,
         )
 
-    def register_screenshot(self, filepath: str, success: bool = True, extra: Optional[Dict[str, Any]] = None):
+    def _resolve_pending_stats(self):
+        """Completa exists/file_size de los registros pendientes con un os.scandir por directorio"""
+        by_dir: Dict[str, Dict[str, List[FileEvidence]]] = defaultdict(lambda: defaultdict(list))
+        resolved: List[FileEvidence] = []
+        while self._pending_stats:
+            record = self._pending_stats.popleft()
+            directory, name = os.path.split(record.filepath)
+            by_dir[directory or "."][name].append(record)
+            resolved.append(record)
+
+        for directory, wanted in by_dir.items():
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        records = wanted.pop(entry.name, None)
+                        if records is None:
+                            continue
+                        size = entry.stat().st_size
+                        for record in records:
+                            record.exists = True
+                            record.file_size = size
+            except OSError:
+                pass
+            # Lo que no apareció en el listado no existe (o el directorio no es accesible)
+            for records in wanted.values():
+                for record in records:
+                    record.exists = False
+
+        # La línea "file" del diario se escribió con exists/file_size en null: completar el diario
+        for record in resolved:
+            self._journal("file_stat", {
+                "filepath": record.filepath,
+                "exists": record.exists,
+                "file_size": record.file_size,
+            })
+
+    def register_screenshot(
+        self,
+        filepath: str,
+        success: bool = True,
+        extra: Optional[Dict[str, Any]] = None,
+        file_size: Optional[int] = None
+    ):
         """Atajo para registrar screenshots guardados por otros módulos"""
-        self.capture_file_operation("SCREENSHOT", filepath, success, extra)
+        self.capture_file_operation("SCREENSHOT", filepath, success, extra, file_size=file_size)
 
-    def _auto_discover_screenshots(self) -> List[str]:
-        """Descubre screenshots en el directorio de evidencias"""
+    def _auto_discover_screenshots(self) -> List[Tuple[str, int]]:
+        """Descubre screenshots en el directorio de evidencias como (ruta, tamaño)"""
         try:
-            return [str(p) for p in EVIDENCES_DIR.glob("*.png")]
+            # DirEntry.stat() reutiliza la información del listado del directorio
+            with os.scandir(EVIDENCES_DIR) as it:
+                return [
+                    (e.path, e.stat().st_size)
+                    for e in it
+                    if e.name.endswith(FileSettings.SCREENSHOT_EXTENSIONS) and e.is_file()
+                ]
         except Exception:
             return []
 
+    def _write_ndjson(self, path):
+        """Escribe eventos y archivos como NDJSON, una línea por registro con su tipo"""
+        dumps = orjson.dumps
+        with open(path, "wb") as f:
+            for e in self.events:
+                f.write(dumps({"kind": "event", **vars(e)}, default=str) + b"\n")
+            for r in self.files:
+                f.write(dumps({"kind": "file", **vars(r)}, default=str) + b"\n")
+
     def save_evidence_log(self, process_stats: Optional[Dict[str, Any]] = None) -> str:
         """
         Persiste un JSON con el resumen de evidencias del proceso.
         Incluye eventos, operaciones de archivos y metadatos.
         """
         try:
+            self._resolve_pending_stats()
+
             # Auto registro de screenshots si no se añadieron explícitamente
-            for shot in self._auto_discover_screenshots():
-                # Evitar duplicados por filepath
-                if not any(f.filepath == shot for f in self.files):
-                    self.register_screenshot(shot, True)
+            existing = {f.filepath for f in self.files}
+            for shot, size in self._auto_discover_screenshots():
+                # Evitar duplicados por filepath (búsqueda O(1) en el set)
+                if shot not in existing:
+                    self.register_screenshot(shot, True, file_size=size)
+                    existing.add(shot)
 
             finished_at = datetime.now()
             duration_sec = round((finished_at - self.started_at).total_seconds(), 2)
@@ -121,9 +239,8 @@ class EvidenceManager:
                 "finished_at": finished_at.isoformat(timespec="seconds"),
                 "duration_seconds": duration_sec,
                 "process_stats": process_stats or {},
-                "events": [asdict(e) for e in self.events],
-                "files": [asdict(f) for f in self.files],
                 "logs_hint": str(LOGS_DIR),
+                "journal": str(self.journal_path),
             }
 
             # Nombre de archivo con timestamp
@@ -131,8 +248,21 @@ class EvidenceManager:
             filename = f"{FileSettings.EVIDENCE_PREFIX}{ts}.json"
             out_path = EVIDENCES_DIR / filename
 
-            with open(out_path, "w", encoding=FileSettings.DEFAULT_ENCODING) as f:
-                json.dump(evidence_doc, f, ensure_ascii=FileSettings.JSON_ENSURE_ASCII, indent=FileSettings.JSON_INDENT)
+            if len(self.events) + len(self.files) > FileSettings.EVIDENCE_INLINE_LIMIT:
+                # Volumen grande: registros en NDJSON (legible por streaming con jq) y resumen compacto
+                records_path = out_path.with_suffix(FileSettings.NDJSON_EXTENSION)
+                self._write_ndjson(records_path)
+                evidence_doc["events_count"] = len(self.events)
+                evidence_doc["files_count"] = len(self.files)
+                evidence_doc["records_file"] = str(records_path)
+                option = orjson.OPT_NON_STR_KEYS
+            else:
+                # Campos planos: vars() evita la copia recursiva de asdict()
+                evidence_doc["events"] = [vars(e) for e in self.events]
+                evidence_doc["files"] = [vars(f) for f in self.files]
+                option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+            out_path.write_bytes(orjson.dumps(evidence_doc, option=option, default=str))
 
             self.logger.info(f"✅ Evidencias registradas: {out_path}")
             return str(out_path)
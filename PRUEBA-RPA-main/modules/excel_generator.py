@@ -3,18 +3,107 @@ Generador de reportes Excel con estadísticas
 Crea hojas de productos y resumen con gráficos
 """
 
-import pandas as pd
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 from openpyxl.chart import BarChart, Reference
+import io
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional
 
 from config.settings import ExcelSettings, REPORTS_DIR
 from utils.logger import setup_logger
 
 
+# Estilos openpyxl (inmutables): se crean una vez y se comparten entre celdas y reportes
+_HEADER_FONT = Font(bold=True, color='000000')
+_HEADER_FILL = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+_CENTER_ALIGN = Alignment(horizontal='center')
+_TITLE_FONT = Font(bold=True, size=16)
+_SECTION_FONT = Font(bold=True, size=14)
+_BOLD_FONT = Font(bold=True)
+_CATEGORY_FILL = PatternFill(start_color='E6E6E6', end_color='E6E6E6', fill_type='solid')
+_FOOTER_FONT = Font(italic=True, size=10)
+
+# Encabezados de las tablas, compartidos por ambos motores
+_PRODUCT_HEADERS = ('ID', 'Título', 'Precio', 'Categoría', 'Descripción', 'Fecha Inserción')
+_CATEGORY_HEADERS = ('Categoría', 'Cantidad', 'Precio Promedio', 'Precio Mínimo', 'Precio Máximo')
+
+# Anchos de columna por hoja, con la letra de columna ya resuelta para openpyxl
+_PRODUCT_COLUMN_WIDTHS = (10, 40, 15, 20, 50, 20)
+_SUMMARY_COLUMN_WIDTHS = (20, 12, 18, 15, 15)
+_PRODUCT_COLUMNS = tuple(
+    (get_column_letter(col_num), width) for col_num, width in enumerate(_PRODUCT_COLUMN_WIDTHS, 1)
+)
+_SUMMARY_COLUMNS = tuple(
+    (get_column_letter(col_num), width) for col_num, width in enumerate(_SUMMARY_COLUMN_WIDTHS, 1)
+)
+
+
+def _dict_row_values(product: Dict) -> tuple:
+    """Valores de una fila de la hoja de productos a partir de un dict de producto"""
+    return (
+        product['id'],
+        product['title'],
+        product['price'],
+        product['category'],
+        # Descripción recortada a 100 caracteres, en línea (sin llamada a función por fila)
+        d if len(d := product['description']) <= 100 else d[:100] + '...',
+        product['fecha_insercion'],
+    )
+
+
+def _iter_rows(products: Iterable) -> Iterator[tuple]:
+    """
+    Adapta los productos a tuplas en orden de columnas, sin materializarlos.
+    
+    El tipo se detecta una sola vez con la primera fila: las tuplas (p. ej. de
+    DatabaseManager.get_report_rows_iter) ya vienen listas y con la descripción recortada;
+    los dicts se convierten con _dict_row_values.
+    """
+    it = iter(products)
+    first = list(islice(it, 1))
+    if not first:
+        return iter(())
+    rows = chain(first, it)
+    return rows if isinstance(first[0], tuple) else map(_dict_row_values, rows)
+
+
+def _render_category_chart_png(category_stats: List[Dict]) -> Optional[io.BytesIO]:
+    """
+    Renderiza el gráfico de productos por categoría como PNG en memoria
+    
+    matplotlib es opcional: solo se importa si CHART_STYLE='image' y, si no está
+    instalado, se devuelve None para que el llamador use el gráfico nativo.
+    
+    Returns:
+        BytesIO con la imagen PNG, o None si matplotlib no está disponible
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return None
+    
+    # 15 x 10 cm, mismo tamaño que el gráfico nativo
+    fig, ax = plt.subplots(figsize=(5.9, 3.9), dpi=96)
+    try:
+        ax.bar([c['category'] for c in category_stats], [c['count'] for c in category_stats])
+        ax.set_title('Productos por Categoría')
+        ax.set_xlabel('Categoría')
+        ax.set_ylabel('Cantidad')
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    buf.seek(0)
+    return buf
+
+
 class ExcelReportGenerator:
     """Generador de reportes Excel"""
     
@@ -24,12 +113,12 @@ class ExcelReportGenerator:
         # Crear directorio de reportes
         REPORTS_DIR.mkdir(exist_ok=True)
     
-    def generate_report(self, products: List[Dict], statistics: Dict) -> str:
+    def generate_report(self, products: Iterable[Dict], statistics: Dict) -> str:
         """
-        Genera reporte Excel completo
+        Genera reporte Excel completo (workbook write-only: las filas se escriben a disco al vuelo)
         
         Args:
-            products: Lista de productos
+            products: Productos como dicts o tuplas en orden de columnas (lista o iterador; se recorren una sola vez)
             statistics: Estadísticas calculadas
             
         Returns:
@@ -43,18 +132,19 @@ class ExcelReportGenerator:
             filename = f"Reporte_{today}.xlsx"
             filepath = REPORTS_DIR / filename
             
-            # Crear workbook
-            wb = Workbook()
-            
-            # Eliminar hoja por defecto
-            wb.remove(wb.active)
-            
-            # Crear hojas
-            self._create_products_sheet(wb, products)
-            self._create_summary_sheet(wb, statistics)
-            
-            # Guardar archivo
-            wb.save(filepath)
+            if ExcelSettings.ENGINE == 'xlsxwriter':
+                # Motor C-optimizado en modo constant_memory: cada fila se vuelca al disco al escribirse
+                total_products = self._write_report_xlsxwriter(filepath, products, statistics)
+            else:
+                # Crear workbook en modo write-only (no tiene hoja por defecto)
+                wb = Workbook(write_only=True)
+                
+                # Crear hojas
+                total_products = self._create_products_sheet(wb, products)
+                self._create_summary_sheet(wb, statistics)
+                
+                # Guardar archivo
+                wb.save(filepath)
             
             file_size = filepath.stat().st_size
             
@@ -67,7 +157,7 @@ class ExcelReportGenerator:
             
             self.logger.log_step(
                 4, "Generación de reporte Excel", "COMPLETADO",
-                {"archivo": str(filepath), "productos": len(products)}
+                {"archivo": str(filepath), "productos": total_products}
             )
             
             return str(filepath)
@@ -76,109 +166,208 @@ class ExcelReportGenerator:
             self.logger.error(f"Error generando reporte Excel: {str(e)}")
             raise
     
-    def _create_products_sheet(self, workbook: Workbook, products: List[Dict]):
-        """Crea la hoja de productos"""
+    def _create_products_sheet(self, workbook: Workbook, products: Iterable[Dict]) -> int:
+        """
+        Crea la hoja de productos escribiendo fila a fila
+        
+        Returns:
+            int: Cantidad de productos escritos
+        """
         sheet_name = ExcelSettings.SHEET_NAMES[ExcelSettings.LANGUAGE]['products']
         ws = workbook.create_sheet(sheet_name)
         
-        # Headers
-        headers = ['ID', 'Título', 'Precio', 'Categoría', 'Descripción', 'Fecha Inserción']
-        ws.append(headers)
-        
-        # Aplicar estilo a headers
-        header_font = Font(bold=True, color='000000')
-        header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-        header_alignment = Alignment(horizontal='center')
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Datos de productos
-        for product in products:
-            ws.append([
-                product['id'],
-                product['title'],
-                product['price'],
-                product['category'],
-                product['description'][:100] + '...' if len(product['description']) > 100 else product['description'],
-                product['fecha_insercion']
-            ])
-        
-        # Ajustar anchos de columna
-        column_widths = [10, 40, 15, 20, 50, 20]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[ws.cell(row=1, column=col_num).column_letter].width = width
-        
-        # Formato de números para precios
-        for row in range(2, len(products) + 2):
-            price_cell = ws.cell(row=row, column=3)
-            price_cell.number_format = '#,##0.00'
+        # Ajustar anchos de columna (en write-only deben definirse antes de escribir filas)
+        for letter, width in _PRODUCT_COLUMNS:
+            ws.column_dimensions[letter].width = width
+        
+        # Headers con estilo
+        ws.append([
+            self._styled_cell(ws, header, font=_HEADER_FONT, fill=_HEADER_FILL, alignment=_CENTER_ALIGN)
+            for header in _PRODUCT_HEADERS
+        ])
+        
+        # Datos de productos (precio con formato numérico). La celda de precio se crea una vez:
+        # append() serializa la fila en el momento, así que basta con actualizar su valor
+        price_cell = self._styled_cell(ws, None, number_format='#,##0.00')
+        count = 0
+        for count, (pid, title, price, category, description, fecha) in enumerate(_iter_rows(products), 1):
+            price_cell.value = price
+            ws.append([pid, title, price_cell, category, description, fecha])
+        
+        return count
+    
+    def _styled_cell(self, worksheet, value, font=None, fill=None, alignment=None, number_format=None):
+        """Crea una celda write-only con el estilo indicado"""
+        cell = WriteOnlyCell(worksheet, value=value)
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if alignment is not None:
+            cell.alignment = alignment
+        if number_format is not None:
+            cell.number_format = number_format
+        return cell
     
     def _create_summary_sheet(self, workbook: Workbook, statistics: Dict):
-        """Crea la hoja de resumen con estadísticas"""
+        """Crea la hoja de resumen con estadísticas (filas escritas en orden, modo write-only)"""
         sheet_name = ExcelSettings.SHEET_NAMES[ExcelSettings.LANGUAGE]['summary']
         ws = workbook.create_sheet(sheet_name)
         
-        # Título
-        ws['A1'] = 'RESUMEN DE PRODUCTOS'
-        ws['A1'].font = Font(bold=True, size=16)
-        ws['A1'].alignment = Alignment(horizontal='center')
-        ws.merge_cells('A1:D1')
+        # Ajustar anchos (antes de escribir filas)
+        for letter, width in _SUMMARY_COLUMNS:
+            ws.column_dimensions[letter].width = width
         
-        # Estadísticas generales
-        ws['A3'] = 'Estadísticas Generales'
-        ws['A3'].font = Font(bold=True, size=14)
+        currency_format = '$#,##0.00'
         
-        ws['A4'] = 'Total de productos:'
-        ws['B4'] = statistics.get('total_products', 0)
+        # Título (fila 1)
+        ws.merged_cells.add('A1:D1')
+        ws.append([self._styled_cell(
+            ws, 'RESUMEN DE PRODUCTOS',
+            font=_TITLE_FONT, alignment=_CENTER_ALIGN
+        )])
+        ws.append([])
         
-        ws['A5'] = 'Precio promedio general:'
-        ws['B5'] = statistics.get('avg_price', 0)
-        ws['B5'].number_format = '$#,##0.00'
+        # Estadísticas generales (filas 3-5)
+        ws.append([self._styled_cell(ws, 'Estadísticas Generales', font=_SECTION_FONT)])
+        ws.append(['Total de productos:', statistics.get('total_products', 0)])
+        ws.append([
+            'Precio promedio general:',
+            self._styled_cell(ws, statistics.get('avg_price', 0), number_format=currency_format)
+        ])
+        ws.append([])
         
-        # Estadísticas por categoría
-        ws['A7'] = 'Estadísticas por Categoría'
-        ws['A7'].font = Font(bold=True, size=14)
+        # Estadísticas por categoría (fila 7)
+        ws.append([self._styled_cell(ws, 'Estadísticas por Categoría', font=_SECTION_FONT)])
         
-        # Headers para tabla de categorías
-        category_headers = ['Categoría', 'Cantidad', 'Precio Promedio', 'Precio Mínimo', 'Precio Máximo']
-        for col_num, header in enumerate(category_headers, 1):
-            cell = ws.cell(row=8, column=col_num)
-            cell.value = header
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color='E6E6E6', end_color='E6E6E6', fill_type='solid')
+        # Headers para tabla de categorías (fila 8)
+        ws.append([
+            self._styled_cell(ws, header, font=_BOLD_FONT, fill=_CATEGORY_FILL)
+            for header in _CATEGORY_HEADERS
+        ])
         
-        # Datos por categoría
+        # Datos por categoría (desde la fila 9)
+        # Como en la hoja de productos, las celdas con formato moneda se crean una vez y se reutilizan
         category_stats = statistics.get('category_stats', [])
-        for row_num, category in enumerate(category_stats, 9):
-            ws.cell(row=row_num, column=1, value=category['category'])
-            ws.cell(row=row_num, column=2, value=category['count'])
-            ws.cell(row=row_num, column=3, value=category['avg_price'])
-            ws.cell(row=row_num, column=4, value=category['min_price'])
-            ws.cell(row=row_num, column=5, value=category['max_price'])
-            
-            # Formato de números
-            for col in [3, 4, 5]:
-                ws.cell(row=row_num, column=col).number_format = '$#,##0.00'
-        
-        # Ajustar anchos
-        column_widths = [20, 12, 18, 15, 15]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[ws.cell(row=8, column=col_num).column_letter].width = width
+        avg_cell, min_cell, max_cell = (
+            self._styled_cell(ws, None, number_format=currency_format) for _ in range(3)
+        )
+        for category in category_stats:
+            avg_cell.value = category['avg_price']
+            min_cell.value = category['min_price']
+            max_cell.value = category['max_price']
+            ws.append([category['category'], category['count'], avg_cell, min_cell, max_cell])
         
         # Agregar gráfico si está habilitado
         if ExcelSettings.INCLUDE_CHARTS and category_stats:
-            self._add_category_chart(ws, category_stats)
+            png = (_render_category_chart_png(category_stats)
+                   if ExcelSettings.CHART_STYLE == 'image' else None)
+            if png is not None:
+                # Imagen pre-renderizada (requiere Pillow para openpyxl)
+                from openpyxl.drawing.image import Image
+                ws.add_image(Image(png), 'G8')
+            else:
+                # Última fila de la tabla de categorías (encabezado en la fila 8)
+                self._add_category_chart(ws, last_row=8 + len(category_stats))
         
-        # Información de generación
-        ws[f'A{len(category_stats) + 12}'] = f'Reporte generado: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-        ws[f'A{len(category_stats) + 12}'].font = Font(italic=True, size=10)
+        # Información de generación (fila len(category_stats) + 12)
+        for _ in range(3):
+            ws.append([])
+        ws.append([self._styled_cell(
+            ws, f'Reporte generado: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
+            font=_FOOTER_FONT
+        )])
     
-    def _add_category_chart(self, worksheet, category_stats: List[Dict]):
-        """Agrega gráfico de barras por categoría"""
+    def _write_report_xlsxwriter(self, filepath: Path, products: Iterable[Dict], statistics: Dict) -> int:
+        """
+        Escribe el reporte completo con xlsxwriter (misma estructura que el motor openpyxl)
+        
+        Returns:
+            int: Cantidad de productos escritos
+        """
+        import xlsxwriter
+        
+        sheet_names = ExcelSettings.SHEET_NAMES[ExcelSettings.LANGUAGE]
+        workbook = xlsxwriter.Workbook(str(filepath), {'constant_memory': True, 'in_memory': False})
+        try:
+            # Formatos creados una sola vez y compartidos por todas las celdas
+            header_fmt = workbook.add_format({
+                'bold': True, 'font_color': '#000000', 'bg_color': '#CCCCCC', 'align': 'center'
+            })
+            price_fmt = workbook.add_format({'num_format': '#,##0.00'})
+            currency_fmt = workbook.add_format({'num_format': '$#,##0.00'})
+            
+            # Hoja de productos
+            ws = workbook.add_worksheet(sheet_names['products'])
+            for col, width in enumerate(_PRODUCT_COLUMN_WIDTHS):
+                # El formato de columna aplica a las celdas escritas sin formato propio (precio)
+                ws.set_column(col, col, width, price_fmt if col == 2 else None)
+            ws.write_row(0, 0, _PRODUCT_HEADERS, header_fmt)
+            
+            count = 0
+            write_row = ws.write_row
+            for count, row in enumerate(_iter_rows(products), 1):
+                write_row(count, 0, row)
+            
+            # Hoja de resumen (filas en orden creciente, requisito de constant_memory)
+            ws = workbook.add_worksheet(sheet_names['summary'])
+            for col, width in enumerate(_SUMMARY_COLUMN_WIDTHS):
+                # Columnas C-E (precios por categoría) con formato moneda a nivel de columna
+                ws.set_column(col, col, width, currency_fmt if col >= 2 else None)
+            section_fmt = workbook.add_format({'bold': True, 'font_size': 14})
+            
+            ws.merge_range(0, 0, 0, 3, 'RESUMEN DE PRODUCTOS',
+                           workbook.add_format({'bold': True, 'font_size': 16, 'align': 'center'}))
+            ws.write(2, 0, 'Estadísticas Generales', section_fmt)
+            ws.write_row(3, 0, ['Total de productos:', statistics.get('total_products', 0)])
+            ws.write(4, 0, 'Precio promedio general:')
+            ws.write(4, 1, statistics.get('avg_price', 0), currency_fmt)
+            ws.write(6, 0, 'Estadísticas por Categoría', section_fmt)
+            ws.write_row(7, 0, _CATEGORY_HEADERS,
+                         workbook.add_format({'bold': True, 'bg_color': '#E6E6E6'}))
+            
+            category_stats = statistics.get('category_stats', [])
+            for row, category in enumerate(category_stats, 8):
+                ws.write_row(row, 0, [category['category'], category['count'], category['avg_price'],
+                                      category['min_price'], category['max_price']])
+            
+            png = (_render_category_chart_png(category_stats)
+                   if ExcelSettings.INCLUDE_CHARTS and category_stats and ExcelSettings.CHART_STYLE == 'image'
+                   else None)
+            if png is not None:
+                ws.insert_image('G8', 'category_chart.png', {'image_data': png})
+            elif ExcelSettings.INCLUDE_CHARTS and category_stats:
+                last_row = 7 + len(category_stats)
+                chart = workbook.add_chart({'type': 'column'})
+                chart.add_series({
+                    'name': [ws.name, 7, 1],
+                    'categories': [ws.name, 8, 0, last_row, 0],
+                    'values': [ws.name, 8, 1, last_row, 1],
+                })
+                chart.set_title({'name': 'Productos por Categoría'})
+                chart.set_x_axis({'name': 'Categoría'})
+                chart.set_y_axis({'name': 'Cantidad'})
+                chart.set_style(10)
+                # 15 x 10 cm, como en el motor openpyxl
+                chart.set_size({'width': 567, 'height': 378})
+                ws.insert_chart('G8', chart)
+            
+            ws.write(len(category_stats) + 11, 0,
+                     f'Reporte generado: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
+                     workbook.add_format({'italic': True, 'font_size': 10}))
+        finally:
+            workbook.close()
+        
+        return count
+    
+    def _add_category_chart(self, worksheet, last_row: int):
+        """
+        Agrega gráfico de barras por categoría
+        
+        Args:
+            worksheet: Hoja de resumen
+            last_row: Última fila con datos de categoría
+        """
         try:
             # Crear gráfico de barras
             chart = BarChart()
@@ -189,8 +378,8 @@ class ExcelReportGenerator:
             chart.x_axis.title = 'Categoría'
             
             # Datos para el gráfico
-            data = Reference(worksheet, min_col=2, min_row=8, max_row=8 + len(category_stats), max_col=2)
-            cats = Reference(worksheet, min_col=1, min_row=9, max_row=8 + len(category_stats))
+            data = Reference(worksheet, min_col=2, min_row=8, max_row=last_row, max_col=2)
+            cats = Reference(worksheet, min_col=1, min_row=9, max_row=last_row)
             
             chart.add_data(data, titles_from_data=True)
             chart.set_categories(cats)
@@ -198,7 +387,7 @@ class ExcelReportGenerator:
             # Posicionar gráfico
             chart.height = 10
             chart.width = 15
-            worksheet.add_chart(chart, f"G8")
+            worksheet.add_chart(chart, "G8")
             
         except Exception as e:
             self.logger.warning(f"Error agregando gráfico: {str(e)}")
@@ -3,18 +3,54 @@ Cliente para Microsoft OneDrive usando Graph API
 Sube archivos JSON y Excel automáticamente
 """
 
+import mmap
 import os
+import time
 import requests
 import json
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
 from typing import Optional, Dict
 from urllib.parse import quote
-from msal import ConfidentialClientApplication
+from msal import ConfidentialClientApplication, SerializableTokenCache
 
 from config.settings import OneDriveSettings
 from utils.logger import setup_logger
 
 
+@contextmanager
+def _open_for_upload(path: Path):
+    """
+    Abre un archivo recién generado para subirlo sin contaminar la caché de páginas
+
+    El archivo no se vuelve a leer localmente tras la subida: se avisa al kernel de lectura
+    secuencial y, al cerrar, se liberan sus páginas (POSIX_FADV_DONTNEED). En macOS se usa
+    F_NOCACHE. No se usa O_DIRECT porque exige buffers y offsets alineados al bloque.
+    """
+    f = open(path, 'rb')
+    fd = f.fileno()
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        else:
+            try:
+                import fcntl
+                if hasattr(fcntl, 'F_NOCACHE'):
+                    fcntl.fcntl(fd, fcntl.F_NOCACHE, 1)
+            except ImportError:
+                pass  # Windows: sin equivalente, lectura normal
+        yield f
+    finally:
+        if hasattr(os, 'posix_fadvise'):
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+        f.close()
+
+
 class OneDriveClient:
     """Cliente para subir archivos a OneDrive"""
     
@@ -22,6 +58,31 @@ class OneDriveClient:
         self.logger = setup_logger("OneDriveClient")
         self.access_token = None
         self.is_app_only = False
+        self._token_expires_at = 0.0
+        
+        # Caché de tokens MSAL persistida en disco: las ejecuciones siguientes reutilizan el
+        # token vigente sin volver a pasar por login.microsoftonline.com
+        self._msal_app = None
+        self._token_cache = SerializableTokenCache()
+        self._load_token_cache()
+        
+        # Sesión única: reutiliza conexiones TLS entre verificación de carpetas y subidas
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=10,
+            max_retries=Retry(
+                total=OneDriveSettings.RETRY_ATTEMPTS,
+                backoff_factor=OneDriveSettings.RETRY_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        
+        # Rutas ya verificadas/creadas en OneDrive durante esta ejecución
+        self._known_dirs = set()
         
         if not OneDriveSettings.is_configured():
             self.logger.warning("⚠️ OneDrive no está configurado completamente")
@@ -34,18 +95,22 @@ class OneDriveClient:
             
             self.logger.info("Autenticando con Microsoft Graph...")
             
-            # Crear aplicación MSAL
-            app = ConfidentialClientApplication(
-                OneDriveSettings.CLIENT_ID,
-                authority=f"https://login.microsoftonline.com/{OneDriveSettings.TENANT_ID}",
-                client_credential=OneDriveSettings.CLIENT_SECRET,
-            )
+            # Crear aplicación MSAL (una vez por cliente, ligada a la caché de tokens)
+            if self._msal_app is None:
+                self._msal_app = ConfidentialClientApplication(
+                    OneDriveSettings.CLIENT_ID,
+                    authority=f"https://login.microsoftonline.com/{OneDriveSettings.TENANT_ID}",
+                    client_credential=OneDriveSettings.CLIENT_SECRET,
+                    token_cache=self._token_cache,
+                )
+            app = self._msal_app
             
             # Obtener token
             result = app.acquire_token_silent(OneDriveSettings.SCOPE, account=None)
             
             if not result:
                 result = app.acquire_token_for_client(scopes=OneDriveSettings.SCOPE)
+            self._save_token_cache()
             
             # Detectar si el token es de aplicación (app-only) o delegado
             # Tokens delegados suelen incluir id_token; app-only no.
@@ -53,6 +118,12 @@ class OneDriveClient:
             
             if "access_token" in result:
                 self.access_token = result["access_token"]
+                # Renovar con margen antes de la expiración real (Graph: ~1 hora)
+                self._token_expires_at = (
+                    time.time() + int(result.get("expires_in", 3600)) - OneDriveSettings.TOKEN_REFRESH_MARGIN
+                )
+                # Cabecera por defecto de la sesión: no se reconstruye en cada petición
+                self.session.headers['Authorization'] = f'Bearer {self.access_token}'
                 
                 # En flujo app-only es obligatorio especificar un usuario o drive destino
                 if self.is_app_only and not (OneDriveSettings.TARGET_USER_ID or OneDriveSettings.TARGET_USER_EMAIL):
@@ -73,6 +144,35 @@ class OneDriveClient:
             self.logger.error(f"Error en autenticación: {str(e)}")
             return False
     
+    def _ensure_token(self) -> bool:
+        """Autentica solo si no hay token o el vigente está por expirar"""
+        if self.access_token is None or time.time() >= self._token_expires_at:
+            return self.authenticate()
+        return True
+    
+    def _load_token_cache(self):
+        """Carga la caché de tokens MSAL desde disco si existe"""
+        cache_path = OneDriveSettings.TOKEN_CACHE_PATH
+        try:
+            if cache_path.exists():
+                self._token_cache.deserialize(cache_path.read_text(encoding='utf-8'))
+        except Exception as e:
+            self.logger.warning(f"No se pudo cargar la caché de tokens: {str(e)}")
+    
+    def _save_token_cache(self):
+        """Persiste la caché de tokens MSAL si cambió (solo legible por el usuario)"""
+        if not self._token_cache.has_state_changed:
+            return
+        cache_path = OneDriveSettings.TOKEN_CACHE_PATH
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self._token_cache.serialize())
+            self._token_cache.has_state_changed = False
+        except Exception as e:
+            self.logger.warning(f"No se pudo guardar la caché de tokens: {str(e)}")
+    
     def upload_file(self, local_path: str, remote_path: str, file_type: str = "json") -> bool:
         """
         Sube archivo a OneDrive
@@ -86,9 +186,8 @@ class OneDriveClient:
             bool: True si la subida fue exitosa
         """
         try:
-            if not self.access_token:
-                if not self.authenticate():
-                    return False
+            if not self._ensure_token():
+                return False
             
             local_file = Path(local_path)
             if not local_file.exists():
@@ -107,8 +206,10 @@ class OneDriveClient:
             base_path = base_paths.get(file_type, OneDriveSettings.JSON_PATH)
             full_remote_path = f"{base_path}/{remote_path}"
             
-            # Crear directorio si no existe
-            self._ensure_directory_exists(base_path)
+            # Graph crea las carpetas padre al hacer PUT/createUploadSession sobre la ruta;
+            # la creación explícita solo se hace si la política lo exige (una vez por ruta)
+            if not OneDriveSettings.AUTO_CREATE_PARENTS:
+                self._ensure_directory_exists(base_path)
             
             # Subir archivo
             file_size = local_file.stat().st_size
@@ -133,14 +234,14 @@ class OneDriveClient:
             encoded_path = quote(remote_path.strip('/'), safe="/")
             url = f"{OneDriveSettings.get_drive_base_url()}/root:/{encoded_path}:/content"
             
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/octet-stream'
-            }
+            headers = {'Content-Type': 'application/octet-stream'}
             
-            size = local_file.stat().st_size
-            with open(local_file, 'rb') as f:
-                response = requests.put(url, headers=headers, data=f)
+            # Archivo menor que CHUNK_SIZE: una sola lectura y un único buffer contiguo para sendall,
+            # en vez de que http.client recorra el archivo en bloques de 8 KiB
+            with _open_for_upload(local_file) as f:
+                payload = f.read()
+            size = len(payload)
+            response = self.session.put(url, headers=headers, data=payload)
             
             if response.status_code in [200, 201]:
                 self.logger.log_file_operation("ONEDRIVE_UPLOAD", remote_path, size, True)
@@ -162,10 +263,7 @@ class OneDriveClient:
             encoded_path = quote(remote_path.strip('/'), safe="/")
             url = f"{OneDriveSettings.get_drive_base_url()}/root:/{encoded_path}:/createUploadSession"
             
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
+            headers = {'Content-Type': 'application/json'}
             
             data = {
                 "item": {
@@ -173,7 +271,7 @@ class OneDriveClient:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            response = self.session.post(url, headers=headers, json=data)
             
             if response.status_code != 200:
                 self.logger.error(f"Error creando sesión: {response.status_code} - {response.text}")
@@ -183,37 +281,47 @@ class OneDriveClient:
             upload_url = response.json()['uploadUrl']
             file_size = local_file.stat().st_size
             
-            # Subir por chunks
-            with open(local_file, 'rb') as f:
-                chunk_size = OneDriveSettings.CHUNK_SIZE
-                bytes_uploaded = 0
-                
-                while bytes_uploaded < file_size:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    
-                    chunk_start = bytes_uploaded
-                    chunk_end = min(bytes_uploaded + len(chunk) - 1, file_size - 1)
-                    
-                    headers = {
-                        'Content-Range': f'bytes {chunk_start}-{chunk_end}/{file_size}',
-                        'Content-Length': str(len(chunk)),
-                        'Content-Type': 'application/octet-stream'
-                    }
-                    
-                    response = requests.put(upload_url, headers=headers, data=chunk)
-                    
-                    if response.status_code not in [202, 200, 201]:
-                        self.logger.error(f"Error en chunk: {response.status_code}")
-                        self.logger.log_file_operation("ONEDRIVE_UPLOAD", remote_path, file_size, False)
-                        return False
+            # Subir por chunks (Graph exige que lleguen en orden). El archivo se mapea en memoria y
+            # cada PUT envía una vista del mapa: sin copiar cada fragmento a un bytes nuevo
+            chunk_size = OneDriveSettings.CHUNK_SIZE
+            with _open_for_upload(local_file) as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                view = memoryview(mm)
+                chunk = None
+                try:
+                    if hasattr(mm, 'madvise'):
+                        # Lectura anticipada del kernel mientras el fragmento actual viaja por la red
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
                     
-                    bytes_uploaded += len(chunk)
-                    
-                    # Log progreso
-                    progress = (bytes_uploaded / file_size) * 100
-                    self.logger.debug(f"Progreso: {progress:.1f}%")
+                    for chunk_start in range(0, file_size, chunk_size):
+                        chunk = view[chunk_start:chunk_start + chunk_size]
+                        chunk_end = chunk_start + len(chunk) - 1
+                        
+                        headers = {
+                            # uploadUrl ya va pre-autenticada: Graph rechaza la cabecera Authorization
+                            'Authorization': None,
+                            'Content-Range': f'bytes {chunk_start}-{chunk_end}/{file_size}',
+                            'Content-Length': str(len(chunk)),
+                            'Content-Type': 'application/octet-stream'
+                        }
+                        
+                        response = self.session.put(upload_url, headers=headers, data=chunk)
+                        # Liberar la vista ya (la respuesta conserva una referencia al cuerpo)
+                        chunk.release()
+                        
+                        if response.status_code not in [202, 200, 201]:
+                            self.logger.error(f"Error en chunk: {response.status_code}")
+                            self.logger.log_file_operation("ONEDRIVE_UPLOAD", remote_path, file_size, False)
+                            return False
+                        
+                        # Log progreso
+                        progress = ((chunk_end + 1) / file_size) * 100
+                        self.logger.debug(f"Progreso: {progress:.1f}%")
+                finally:
+                    if chunk is not None:
+                        chunk.release()
+                    view.release()
+                    mm.close()
             
             self.logger.log_file_operation("ONEDRIVE_UPLOAD", remote_path, file_size, True)
             self.logger.info(f"✅ Archivo grande subido: {remote_path}")
@@ -226,62 +334,69 @@ class OneDriveClient:
     def _ensure_directory_exists(self, directory_path: str):
         """Asegura que el directorio existe en OneDrive (creación recursiva)"""
         try:
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
+            headers = {'Content-Type': 'application/json'}
 
             # Normalizar ruta y partirla en segmentos
             clean_path = directory_path.strip('/').replace('\\', '/')
-            if not clean_path:
+            if not clean_path or clean_path in self._known_dirs:
+                return
+
+            # Caso habitual: la ruta completa ya existe -> una sola petición
+            encoded_path = quote(clean_path, safe="/")
+            check_url = f"{OneDriveSettings.get_drive_base_url()}/root:/{encoded_path}"
+            resp = self.session.get(check_url, headers=headers)
+            if resp.status_code == 200:
+                self._remember_dirs(clean_path)
                 return
+            if resp.status_code != 404:
+                self.logger.warning(
+                    f"No se pudo verificar directorio: {clean_path} | status={resp.status_code}"
+                )
 
             segments = clean_path.split('/')
             current_path = ''
 
             for segment in segments:
+                parent = current_path
                 # Avanzar un nivel
                 current_path = f"{current_path}/{segment}" if current_path else segment
+                if current_path in self._known_dirs:
+                    continue
 
-                # Verificar existencia del nivel actual
-                encoded_current = quote(current_path.strip('/'), safe="/")
-                check_url = f"{OneDriveSettings.get_drive_base_url()}/root:/{encoded_current}"
-                resp = requests.get(check_url, headers=headers)
-
-                if resp.status_code == 200:
-                    continue  # Existe, avanzar al siguiente nivel
-                elif resp.status_code == 404:
-                    # Crear este nivel dentro del padre
-                    parent = "/".join(current_path.split('/')[:-1])
-                    if parent:
-                        encoded_parent = quote(parent.strip('/'), safe="/")
-                        create_url = f"{OneDriveSettings.get_drive_base_url()}/root:/{encoded_parent}:/children"
-                    else:
-                        # Crear directamente en root
-                        create_url = f"{OneDriveSettings.get_drive_base_url()}/root/children"
+                # Crear este nivel dentro del padre; 409 indica que ya existía (sin GET previo)
+                if parent:
+                    encoded_parent = quote(parent, safe="/")
+                    create_url = f"{OneDriveSettings.get_drive_base_url()}/root:/{encoded_parent}:/children"
+                else:
+                    # Crear directamente en root
+                    create_url = f"{OneDriveSettings.get_drive_base_url()}/root/children"
 
-                    data = {
-                        "name": segment,
-                        "folder": {},
-                        "@microsoft.graph.conflictBehavior": "replace"
-                    }
-                    create_resp = requests.post(create_url, headers=headers, json=data)
-                    if create_resp.status_code in (200, 201):
-                        self.logger.info(f"📁 Directorio creado: {current_path}")
-                    elif create_resp.status_code == 409:
-                        # Condición de carrera: el folder fue creado en paralelo
-                        self.logger.warning(f"⚠️ Directorio ya existía (409): {current_path}")
-                    else:
-                        self.logger.warning(
-                            f"No se pudo crear directorio: {current_path} | status={create_resp.status_code}"
-                        )
-                        # No abortar, intentar continuar por si es transitorio
+                data = {
+                    "name": segment,
+                    "folder": {},
+                    "@microsoft.graph.conflictBehavior": "fail"
+                }
+                create_resp = self.session.post(create_url, headers=headers, json=data)
+                if create_resp.status_code in (200, 201):
+                    self.logger.info(f"📁 Directorio creado: {current_path}")
+                    self._known_dirs.add(current_path)
+                elif create_resp.status_code == 409:
+                    # Ya existe: continuar con el siguiente nivel
+                    self._known_dirs.add(current_path)
                 else:
                     self.logger.warning(
-                        f"No se pudo verificar directorio: {current_path} | status={resp.status_code}"
+                        f"No se pudo crear directorio: {current_path} | status={create_resp.status_code}"
                     )
+                    # No abortar, intentar continuar por si es transitorio
         except Exception as e:
             self.logger.warning(f"Error verificando/creando ruta en OneDrive: {str(e)}")
+
+    def _remember_dirs(self, clean_path: str):
+        """Registra la ruta y todos sus prefijos como existentes en OneDrive"""
+        current_path = ''
+        for segment in clean_path.split('/'):
+            current_path = f"{current_path}/{segment}" if current_path else segment
+            self._known_dirs.add(current_path)
     
     def upload_json_backup(self, json_path: str) -> bool:
         """Sube respaldo JSON a OneDrive"""
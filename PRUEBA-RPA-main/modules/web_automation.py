@@ -3,63 +3,144 @@ Automatización web para envío de formularios
 Soporta Google Forms, Jotform y Typeform
 """
 
+import atexit
 import os
 import sys
+import weakref
 import time
-import random
+import base64
+import re
+import shutil
 from datetime import datetime
 from typing import Optional, Dict, Any, Callable
 from pathlib import Path
-from functools import wraps
 
-# Add project root to sys.path for imports
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+# Add project root to sys.path for imports (una sola vez, aunque el módulo se recargue)
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-from selenium import webdriver
+# Solo lo que usan las esperas y los handlers; el arranque de Chrome (webdriver, Service,
+# Options) se importa al crear el driver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
 
-from config.settings import WebAutomationSettings, EVIDENCES_DIR
+from config.settings import WebAutomationSettings, FileSettings, EVIDENCES_DIR
+
+# Importable como modules.web_automation o como web_automation (modules/ en sys.path)
+try:
+    from ._chromedriver_cache import CHROME_EXECUTABLES, start_chrome
+except ImportError:
+    from _chromedriver_cache import CHROME_EXECUTABLES, start_chrome
 from utils.logger import setup_logger
 
 
-def retry_with_backoff(max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 10.0):
-    """Decorador para reintentar operaciones con backoff exponencial"""
-    def decorator(func: Callable):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(max_attempts):
-                try:
-                    return func(*args, **kwargs)
-                except (TimeoutException, NoSuchElementException, StaleElementReferenceException) as e:
-                    last_exception = e
-                    if attempt < max_attempts - 1:
-                        delay = min(base_delay * (2 ** attempt) + random.uniform(0, 1), max_delay)
-                        args[0].logger.warning(f"Reintentando {func.__name__} en {delay:.1f}s (intento {attempt + 1}/{max_attempts})")
-                        time.sleep(delay)
-                    else:
-                        args[0].logger.error(f"Error persistente en {func.__name__}: {str(e)}")
-            raise last_exception
-        return wrapper
-    return decorator
+# Nodos que Google Forms / JotForm / Typeform muestran cuando terminó la subida de un archivo
+_UPLOAD_DONE_SELECTOR = "[aria-label*='uploaded'], .file-uploaded, [data-upload-state='done']"
+
+# Textos de confirmación de envío, buscados por el propio navegador (sin transferir page_source).
+# Se evalúa sobre <body> para recorrer su texto una sola vez, sin distinguir mayúsculas
+_CONFIRMATION_TEXTS = ('registrado', 'recorded', 'gracias', 'thank you', 'enviado', 'submitted')
+_CONFIRMATION_XPATH = "//body[{}]".format(" or ".join(
+    f"contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{text}')"
+    for text in _CONFIRMATION_TEXTS
+))
+
+# Asigna el valor con el setter nativo (los frameworks tipo React ignoran `el.value = ...`) y
+# dispara input/change como lo haría el teclado. Devuelve true si el valor quedó asignado
+_SET_VALUE_JS = """
+const [el, value] = arguments;
+const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return el.value === value;
+"""
+
+# Descubre en una sola llamada los campos de texto visibles y habilitados, el primer input de
+# archivo y el primer botón submit visible (Selenium convierte los nodos en WebElement)
+_DISCOVER_FIELDS_JS = """
+const usable = el => el.offsetParent !== null && !el.disabled;
+return {
+    text: [...document.querySelectorAll("input[type='text'], input[type='email'], textarea")].filter(usable),
+    file: document.querySelector("input[type='file']"),
+    submit: [...document.querySelectorAll("input[type='submit'], button[type='submit']")].find(usable) || null,
+};
+"""
+
+# Botón de envío de Google Forms: unión CSS y, como último recurso, unión XPath
+_GOOGLE_SUBMIT_SELECTOR = ", ".join([
+    "[type='submit']",
+    "[role='button'][aria-label*='Enviar']",
+    "[role='button'][aria-label*='Submit']",
+    ".appsMaterialWizButtonPaperbuttonLabel",
+    ".quantumWizButtonPaperbuttonLabel",
+])
+_GOOGLE_SUBMIT_XPATH = " | ".join([
+    "//span[contains(text(), 'Enviar')]//parent::*",
+    "//span[contains(text(), 'Submit')]//parent::*",
+    "//div[@role='button' and contains(., 'Enviar')]",
+    "//input[@value='Enviar']",
+])
+
+# Se ejecuta en el navegador: una sola ida y vuelta en vez de is_displayed/is_enabled/text por
+# candidato. Devuelve el primer elemento visible y habilitado (o null)
+_FIND_SUBMIT_JS = """
+const [selector, xpath] = arguments;
+const usable = el => {
+    const r = el.getBoundingClientRect();
+    return r.width > 0 && r.height > 0 && !el.disabled;
+};
+for (const el of document.querySelectorAll(selector)) {
+    if (usable(el) && /enviar|submit|send/i.test(el.textContent)) return el;
+}
+const snap = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < snap.snapshotLength; i++) {
+    if (usable(snap.snapshotItem(i))) return snap.snapshotItem(i);
+}
+return null;
+"""
+
+
+# Pausas entre reintentos de una operación puntual sobre un elemento (obsoleto o ausente)
+_RETRY_DELAYS = tuple(0.5 * 2 ** attempt for attempt in range(2))
+
+# Automatizadores con navegador abierto; al salir del intérprete se cierran los que queden
+_LIVE_AUTOMATORS = weakref.WeakSet()
+
+
+@atexit.register
+def _close_live_automators():
+    """Cerrar Chrome/chromedriver si el proceso termina sin llamar a close()"""
+    for automator in list(_LIVE_AUTOMATORS):
+        automator.close()
 
 
 class WebFormAutomator:
     """Automatizador de formularios web usando Selenium"""
     
+    # FORM_TYPE -> handler; cualquier otro tipo usa el formulario genérico
+    _FORM_HANDLERS = {
+        'google_forms': '_handle_google_form',
+        'jotform': '_handle_jotform',
+        'typeform': '_handle_typeform',
+    }
+    
+    # Ruta de ChromeDriver que resolvió Selenium Manager con el primer driver del proceso
+    # (compartida entre instancias: los drivers siguientes no vuelven a ejecutarlo)
+    _cached_driver_path: Optional[str] = None
+    
     def __init__(self):
         self.logger = setup_logger("WebAutomator")
         self.driver = None
         self.wait = None
+        # Esperas por timeout, creadas una vez por driver (ver _get_wait)
+        self._waits: Dict[float, WebDriverWait] = {}
+        # Última captura guardada por _take_screenshot
+        self._latest_screenshot: Optional[Path] = None
 
         # Preferencias de modo manual (con fallback a variables de entorno)
         self.allow_manual_login = getattr(WebAutomationSettings, 'ALLOW_MANUAL_LOGIN', os.getenv('ALLOW_MANUAL_LOGIN', 'true').lower() == 'true')
@@ -80,6 +161,11 @@ class WebFormAutomator:
         self.chrome_user_data_dir = getattr(WebAutomationSettings, 'CHROME_USER_DATA_DIR', os.getenv('CHROME_USER_DATA_DIR'))
         self.chrome_profile_dir = getattr(WebAutomationSettings, 'CHROME_PROFILE_DIR', os.getenv('CHROME_PROFILE_DIR'))
         
+        # Handler del tipo de formulario, resuelto una sola vez
+        self._form_handler = getattr(
+            self, self._FORM_HANDLERS.get(WebAutomationSettings.FORM_TYPE.lower(), '_handle_generic_form')
+        )
+        
         # Configurar directorio de evidencias
         EVIDENCES_DIR.mkdir(exist_ok=True)
 
@@ -88,22 +174,20 @@ class WebFormAutomator:
         if timeout is None:
             timeout = WebAutomationSettings.TIMEOUT
 
-        strategies = [
-            (by, value),
-            (By.ID, value.split('=')[-1] if '=' in value else value),
-            (By.NAME, value.split('=')[-1] if '=' in value else value),
-            (By.CLASS_NAME, value.replace('[class*=', '').replace(']', '').replace("'", "")),
-        ]
+        # Alternativas por id/name solo si el valor es un identificador simple; todas se
+        # evalúan en la misma espera (un único timeout, no uno por estrategia)
+        locators = [(by, value)]
+        if re.fullmatch(r'[\w-]+', value):
+            locators += [(By.ID, value), (By.NAME, value)]
 
-        for strategy_by, strategy_value in strategies:
-            try:
-                element = WebDriverWait(self.driver, timeout).until(
-                    EC.element_to_be_clickable((strategy_by, strategy_value))
-                )
-                if element and element.is_displayed():
-                    return element
-            except:
-                continue
+        try:
+            element = self._get_wait(timeout).until(
+                EC.any_of(*(EC.element_to_be_clickable(locator) for locator in locators))
+            )
+            if element and element.is_displayed():
+                return element
+        except:
+            pass
 
         # Fallback: buscar en todo el DOM
         try:
@@ -116,10 +200,107 @@ class WebFormAutomator:
 
         return None
 
+    @classmethod
+    def _new_chrome(cls, options):
+        """
+        Crea un driver de Chrome
+        
+        Selenium Manager (incluido en selenium>=4.11) resuelve ChromeDriver la primera vez;
+        la ruta se reutiliza en este proceso y queda en caché en disco para los siguientes.
+        """
+        driver = start_chrome(options, cls._cached_driver_path)
+        cls._cached_driver_path = driver.service.path
+        return driver
+    
+    def _get_wait(self, timeout: float) -> WebDriverWait:
+        """
+        Devuelve el WebDriverWait del driver actual para el timeout dado (reutilizado entre llamadas)
+        
+        Todas comparten POLL_FREQUENCY e ignoran elementos obsoletos durante el sondeo.
+        """
+        wait = self._waits.get(timeout)
+        if wait is None:
+            wait = WebDriverWait(
+                self.driver, timeout,
+                poll_frequency=WebAutomationSettings.POLL_FREQUENCY,
+                ignored_exceptions=(StaleElementReferenceException,),
+            )
+            self._waits[timeout] = wait
+        return wait
+    
+    def _wait_briefly(self, condition, description: str) -> Any:
+        """
+        Espera explícita corta: retorna en cuanto se cumple la condición
+        
+        Args:
+            condition: Condición de WebDriverWait (EC.* o callable sobre el driver)
+            description: Descripción para el log si la espera vence
+            
+        Returns:
+            Any: Resultado de la condición (p. ej. el elemento encontrado), o None si vence STEP_TIMEOUT
+        """
+        try:
+            return self._get_wait(WebAutomationSettings.STEP_TIMEOUT).until(condition)
+        except TimeoutException:
+            self.logger.debug(f"Espera agotada ({WebAutomationSettings.STEP_TIMEOUT}s): {description}")
+            return None
+    
+    def _fill_field(self, field, text: str):
+        """
+        Reemplaza el valor del campo con una sola llamada a execute_script
+        
+        Si la asignación por JS no queda reflejada, se escribe con send_keys (previo clear)
+        y se espera a que el valor aparezca en el DOM.
+        """
+        if self.driver.execute_script(_SET_VALUE_JS, field, text) is True:
+            return
+        field.clear()
+        field.send_keys(text)
+        self._wait_briefly(lambda d: field.get_attribute('value') == text, "valor del campo")
+    
+    def _retry(self, locate: Callable[[], Any], action: Callable[[Any], Any], description: str, element=None):
+        """
+        Ejecuta una acción sobre un elemento, relocalizándolo si quedó obsoleto
+        
+        Solo se repite la operación que falló (p. ej. el clic), no el formulario completo.
+        
+        Args:
+            locate: Función que vuelve a buscar el elemento
+            action: Operación a ejecutar sobre el elemento
+            description: Descripción para el log
+            element: Elemento ya localizado para el primer intento (opcional)
+        """
+        for attempt, delay in enumerate(_RETRY_DELAYS, 1):
+            try:
+                return action(element if element is not None else locate())
+            except (NoSuchElementException, StaleElementReferenceException) as e:
+                self.logger.warning(
+                    f"Reintentando {description} en {delay:.1f}s (intento {attempt}/{len(_RETRY_DELAYS) + 1}): "
+                    f"{type(e).__name__}"
+                )
+                time.sleep(delay)
+                element = None
+        return action(locate())
+    
+    def _locate_google_submit(self):
+        """Busca el botón de envío de Google Forms (una sola llamada al navegador)"""
+        button = self.driver.execute_script(_FIND_SUBMIT_JS, _GOOGLE_SUBMIT_SELECTOR, _GOOGLE_SUBMIT_XPATH)
+        if not button:
+            raise NoSuchElementException("No se encontró botón de envío")
+        return button
+    
+    def _wait_for_upload(self):
+        """Espera el indicador de subida completada del formulario (si lo hay)"""
+        self._wait_briefly(
+            EC.presence_of_element_located((By.CSS_SELECTOR, _UPLOAD_DONE_SELECTOR)),
+            "confirmación de subida de archivo"
+        )
+
     def _setup_driver(self):
         """Configura y inicializa el driver de Chrome"""
         try:
             self.logger.info("Configurando WebDriver...")
+            from selenium.webdriver.chrome.options import Options
             
             # Opciones de Chrome
             chrome_options = Options()
@@ -131,11 +312,14 @@ class WebFormAutomator:
             # Configuraciones adicionales
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
-            chrome_options.add_experimental_option("prefs", {
+            prefs = {
                 "download.prompt_for_download": False,
                 "download.directory_upgrade": True,
-                "safebrowsing.enabled": True
-            })
+                "safebrowsing.enabled": True,
+                "profile.default_content_setting_values.notifications": 2
+            }
+            chrome_options.add_experimental_option("prefs", prefs)
+            chrome_options.page_load_strategy = WebAutomationSettings.PAGE_LOAD_STRATEGY
 
             # Si se configuró perfil de Chrome, usarlo para mantener sesiones
             if self.chrome_user_data_dir:
@@ -143,21 +327,27 @@ class WebFormAutomator:
             if self.chrome_profile_dir:
                 chrome_options.add_argument(f"--profile-directory={self.chrome_profile_dir}")
             
-            # Instalar y configurar ChromeDriver
-            service = Service(ChromeDriverManager().install())
-            
-            # Crear driver
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Crear driver (ChromeDriver lo resuelve Selenium Manager)
+            self.driver = self._new_chrome(chrome_options)
+            _LIVE_AUTOMATORS.add(self)
             
-            # Configurar timeouts
-            self.driver.implicitly_wait(WebAutomationSettings.IMPLICIT_WAIT)
+            # Configurar timeouts (solo esperas explícitas: mezclarlas con implicitly_wait suma ambos)
             self.driver.set_page_load_timeout(WebAutomationSettings.PAGE_LOAD_TIMEOUT)
             
             # Crear WebDriverWait
-            self.wait = WebDriverWait(self.driver, WebAutomationSettings.TIMEOUT)
-            
-            # Eliminar bandera de automatización
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self._waits.clear()
+            self.wait = self._get_wait(WebAutomationSettings.TIMEOUT)
+            
+            # Bloqueo de recursos a nivel de red (CDP): a diferencia de una preferencia de Chrome,
+            # se puede levantar en caliente antes de la página de confirmación
+            if WebAutomationSettings.BLOCK_RESOURCES:
+                self.driver.execute_cdp_cmd('Network.enable', {})
+            
+            # Eliminar bandera de automatización: se registra una vez y Chrome la aplica antes de los
+            # scripts de cada documento nuevo (incluida la primera navegación al formulario)
+            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+                'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+            })
             
             self.logger.info("✅ WebDriver configurado exitosamente")
             
@@ -198,15 +388,20 @@ class WebFormAutomator:
                 else:
                     self.logger.warning("No se encontró captura reciente. Se adjuntará el Excel por defecto.")
             
-            # Configurar driver
-            self._setup_driver()
+            # Driver persistente: Chrome se inicia solo en el primer envío
+            if self.driver is None:
+                self._setup_driver()
             
-            # Navegar al formulario
+            # Navegar al formulario (sin imágenes, fuentes ni analítica)
+            self._set_resource_blocking(True)
             self.logger.info(f"Navegando a: {WebAutomationSettings.FORM_URL}")
             self.driver.get(WebAutomationSettings.FORM_URL)
             
             # Tomar screenshot inicial
             self._take_screenshot("formulario_inicial.png")
+            
+            # Formulario ya cargado: la confirmación tras el envío carga completa para la evidencia
+            self._set_resource_blocking(False)
 
             # Pausa opcional para permitir login manual y revisión del formulario
             if self.allow_manual_login:
@@ -215,16 +410,7 @@ class WebFormAutomator:
                 time.sleep(self.manual_login_wait)
             
             # Procesar según tipo de formulario
-            form_type = WebAutomationSettings.FORM_TYPE.lower()
-            
-            if form_type == 'google_forms':
-                success = self._handle_google_form(attachment_path, form_data)
-            elif form_type == 'jotform':
-                success = self._handle_jotform(attachment_path, form_data)
-            elif form_type == 'typeform':
-                success = self._handle_typeform(attachment_path, form_data)
-            else:
-                success = self._handle_generic_form(attachment_path, form_data)
+            success = self._form_handler(attachment_path, form_data)
             
             if success:
                 # Tomar screenshot de confirmación
@@ -242,9 +428,8 @@ class WebFormAutomator:
                 self._take_screenshot("formulario_error_exception.png")
             return False
         finally:
-            self._cleanup_driver()
+            self._reset_driver()
     
-    @retry_with_backoff(max_attempts=3, base_delay=2.0)
     def _handle_google_form(self, attachment_path: Path, form_data: Dict[str, Any] = None) -> bool:
         """Maneja formularios de Google Forms con robustez mejorada"""
         try:
@@ -257,31 +442,27 @@ class WebFormAutomator:
             if not form_data:
                 form_data = WebAutomationSettings.FORM_DATA
             
-            # Buscar campos comunes de texto
-            text_inputs = self.driver.find_elements(By.CSS_SELECTOR, 
-                "input[type='text'], input[type='email'], textarea")
+            # Buscar campos comunes de texto (ya filtrados por visibles/habilitados) y de archivo
+            fields = self.driver.execute_script(_DISCOVER_FIELDS_JS)
             
             # Llenar campos de texto
-            for i, input_field in enumerate(text_inputs[:2]):  # Primeros 2 campos
+            for i, input_field in enumerate(fields['text'][:2]):  # Primeros 2 campos
                 try:
-                    if input_field.is_displayed() and input_field.is_enabled():
-                        if i == 0:
-                            # Primer campo: nombre del colaborador
-                            input_field.clear()
-                            input_field.send_keys(form_data.get('collaborator_name', 'Robot RPA'))
-                            time.sleep(0.5)
-                        elif i == 1:
-                            # Segundo campo: fecha o comentarios
-                            input_field.clear()
-                            input_field.send_keys(form_data.get('comments', 
-                                f"Reporte generado el {datetime.now().strftime('%Y-%m-%d')}"))
-                            time.sleep(0.5)
+                    if i == 0:
+                        # Primer campo: nombre del colaborador
+                        self._fill_field(input_field, form_data.get('collaborator_name', 'Robot RPA'))
+                    elif i == 1:
+                        # Segundo campo: fecha o comentarios
+                        self._fill_field(input_field, form_data.get('comments', 
+                            f"Reporte generado el {datetime.now().strftime('%Y-%m-%d')}"))
                 except Exception as e:
                     self.logger.warning(f"Error llenando campo de texto {i}: {str(e)}")
                     continue
             
-            # Buscar campo de subida de archivos (opcional) con método robusto
-            file_input = self._find_element_robust(By.CSS_SELECTOR, "input[type='file']", timeout=10)
+            # Campo de subida de archivos (opcional); si aún no está en el DOM, método robusto
+            file_input = fields['file'] or self._find_element_robust(
+                By.CSS_SELECTOR, "input[type='file']", timeout=10
+            )
 
             if not file_input:
                 if self.require_file_upload:
@@ -291,59 +472,24 @@ class WebFormAutomator:
             else:
                 # Subir archivo con manejo de errores
                 try:
-                    file_input.send_keys(str(Path(attachment_path).absolute()))
+                    file_path = str(Path(attachment_path).absolute())
+                    self._retry(
+                        lambda: self.driver.find_element(By.CSS_SELECTOR, "input[type='file']"),
+                        lambda el: el.send_keys(file_path),
+                        "subida de archivo",
+                        element=file_input,
+                    )
                     self.logger.info("✅ Archivo subido al formulario")
-                    # Esperar un momento para que se procese la subida
-                    time.sleep(2)
+                    # Esperar a que el formulario confirme la subida
+                    self._wait_for_upload()
                 except Exception as e:
                     self.logger.warning(f"Error subiendo archivo: {e}")
                     if self.require_file_upload:
                         raise
             
             # Buscar y hacer clic en el botón de envío
-            submit_selectors = [
-                "[type='submit']",
-                "[role='button'][aria-label*='Enviar']",
-                "[role='button'][aria-label*='Submit']",
-                "div[role='button']:contains('Enviar')",
-                ".appsMaterialWizButtonPaperbuttonLabel",
-                ".quantumWizButtonPaperbuttonLabel"
-            ]
-            
-            submit_button = None
-            for selector in submit_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed() and element.is_enabled():
-                            text = element.text.lower()
-                            if any(word in text for word in ['enviar', 'submit', 'send']):
-                                submit_button = element
-                                break
-                    if submit_button:
-                        break
-                except:
-                    continue
-            
-            if not submit_button:
-                # Buscar por XPath como último recurso
-                xpath_selectors = [
-                    "//span[contains(text(), 'Enviar')]//parent::*",
-                    "//span[contains(text(), 'Submit')]//parent::*",
-                    "//div[@role='button' and contains(., 'Enviar')]",
-                    "//input[@value='Enviar']"
-                ]
-                
-                for xpath in xpath_selectors:
-                    try:
-                        submit_button = self.driver.find_element(By.XPATH, xpath)
-                        if submit_button.is_displayed() and submit_button.is_enabled():
-                            break
-                    except:
-                        continue
-            
-            if not submit_button:
-                raise Exception("No se encontró botón de envío")
+            # Búsqueda completa (unión CSS + respaldo XPath) en un solo execute_script
+            submit_button = self._locate_google_submit()
             
             # Envío condicionado por modo manual
             if not self.auto_submit:
@@ -354,25 +500,23 @@ class WebFormAutomator:
 
             # Hacer clic en enviar
             self.logger.info("Enviando formulario...")
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-            time.sleep(1)
-            submit_button.click()
             
-            # Esperar confirmación
-            time.sleep(3)
+            def click_submit(button):
+                self.driver.execute_script("arguments[0].scrollIntoView(true);", button)
+                self.wait.until(EC.element_to_be_clickable(button))
+                button.click()
             
-            # Verificar confirmación
-            confirmation_texts = [
-                "Tu respuesta se ha registrado",
-                "Your response has been recorded",
-                "Gracias",
-                "Thank you",
-                "enviado",
-                "submitted"
-            ]
+            self._retry(self._locate_google_submit, click_submit, "clic en enviar", element=submit_button)
             
-            page_source = self.driver.page_source.lower()
-            confirmation_found = any(text.lower() in page_source for text in confirmation_texts)
+            # Esperar confirmación: Google redirige a .../formResponse con el mensaje de registro
+            try:
+                self.wait.until(EC.any_of(
+                    EC.url_contains('formResponse'),
+                    EC.presence_of_element_located((By.XPATH, _CONFIRMATION_XPATH))
+                ))
+                confirmation_found = True
+            except TimeoutException:
+                confirmation_found = False
             
             if confirmation_found:
                 self.logger.info("✅ Formulario enviado exitosamente")
@@ -396,29 +540,26 @@ class WebFormAutomator:
             if not form_data:
                 form_data = WebAutomationSettings.FORM_DATA
             
-            # Buscar campos de texto
-            text_fields = self.driver.find_elements(By.CSS_SELECTOR, 
-                "input[type='text'], input[type='email'], textarea")
+            # Buscar campos de texto y de archivo en una sola llamada
+            fields = self.driver.execute_script(_DISCOVER_FIELDS_JS)
             
             # Llenar campos
-            for i, field in enumerate(text_fields[:2]):
+            for i, field in enumerate(fields['text'][:2]):
                 try:
-                    if field.is_displayed() and field.is_enabled():
-                        field.clear()
-                        if i == 0:
-                            field.send_keys(form_data.get('collaborator_name', 'Robot RPA'))
-                        else:
-                            field.send_keys(form_data.get('comments', 
-                                f"Reporte - {datetime.now().strftime('%Y-%m-%d')}"))
-                        time.sleep(0.5)
+                    if i == 0:
+                        self._fill_field(field, form_data.get('collaborator_name', 'Robot RPA'))
+                    else:
+                        self._fill_field(field, form_data.get('comments', 
+                            f"Reporte - {datetime.now().strftime('%Y-%m-%d')}"))
                 except Exception as e:
                     self.logger.warning(f"Error en campo JotForm {i}: {str(e)}")
             
             # Subir archivo
-            file_input = self.driver.find_element(By.CSS_SELECTOR, "input[type='file']")
+            file_input = fields['file']
+            if file_input is None:
+                raise NoSuchElementException("No se encontró campo de subida de archivos")
             file_input.send_keys(str(Path(attachment_path).absolute()))
-            
-            time.sleep(2)
+            self._wait_for_upload()
             
             # Envío condicionado por modo manual
             if not self.auto_submit:
@@ -433,12 +574,11 @@ class WebFormAutomator:
             ))
             submit_button.click()
             
-            time.sleep(3)
-            
-            # Verificar confirmación
+            # Verificar confirmación (retorna en cuanto aparece)
             try:
-                self.wait.until(EC.presence_of_element_located(
-                    (By.CLASS_NAME, "form-confirmation")
+                self.wait.until(EC.any_of(
+                    EC.presence_of_element_located((By.CLASS_NAME, "form-confirmation")),
+                    EC.presence_of_element_located((By.XPATH, _CONFIRMATION_XPATH))
                 ))
                 self.logger.info("✅ JotForm enviado exitosamente")
                 return True
@@ -456,42 +596,43 @@ class WebFormAutomator:
             self.logger.info("Procesando Typeform...")
             
             # Typeform tiene una interfaz más dinámica
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "form")))
+            form = self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "form")))
             
             if not form_data:
                 form_data = WebAutomationSettings.FORM_DATA
             
-            # Esperar y llenar campos uno por uno (Typeform muestra campos secuencialmente)
-            time.sleep(2)
-            
-            # Buscar campo activo
-            active_input = self.driver.find_element(By.CSS_SELECTOR, 
-                "input[type='text']:not([disabled]), textarea:not([disabled])")
+            # Llenar campos uno por uno (Typeform muestra campos secuencialmente)
+            input_selector = "input[type='text']:not([disabled]), textarea:not([disabled])"
+            active_input = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, input_selector)))
             
             if active_input:
                 active_input.send_keys(form_data.get('collaborator_name', 'Robot RPA'))
                 active_input.send_keys(Keys.ENTER)
-                time.sleep(1)
             
-            # Continuar con siguiente campo si existe
-            try:
-                next_input = self.wait.until(EC.element_to_be_clickable(
-                    (By.CSS_SELECTOR, "input[type='text']:not([disabled]), textarea:not([disabled])")
-                ))
-                next_input.send_keys(form_data.get('comments', 
+            # Siguiente campo (distinto del ya respondido) o fin del formulario: en formularios
+            # cortos el campo de archivo o el botón de envío aparecen sin esperar TIMEOUT
+            next_or_end = self._wait_briefly(EC.any_of(
+                lambda d: next(
+                    (e for e in d.find_elements(By.CSS_SELECTOR, input_selector)
+                     if e != active_input and e.is_displayed() and e.is_enabled()),
+                    False
+                ),
+                EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='file']")),
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-qa='submit-button']")),
+            ), "siguiente campo del Typeform")
+            
+            if next_or_end is not None and next_or_end.get_attribute('type') != 'file' \
+                    and next_or_end.get_attribute('data-qa') != 'submit-button':
+                next_or_end.send_keys(form_data.get('comments', 
                     f"Reporte - {datetime.now().strftime('%Y-%m-%d')}"))
-                next_input.send_keys(Keys.ENTER)
-                time.sleep(1)
-            except TimeoutException:
-                pass
+                next_or_end.send_keys(Keys.ENTER)
             
             # Buscar campo de archivo
             file_input = self.wait.until(EC.presence_of_element_located(
                 (By.CSS_SELECTOR, "input[type='file']")
             ))
             file_input.send_keys(str(Path(attachment_path).absolute()))
-            
-            time.sleep(3)
+            self._wait_for_upload()
             
             # Envío condicionado por modo manual
             if not self.auto_submit:
@@ -506,10 +647,14 @@ class WebFormAutomator:
                     "button[type='submit'], button[data-qa='submit-button']")
                 submit_btn.click()
             except NoSuchElementException:
-                # En algunos Typeforms, Enter es suficiente
-                ActionChains(self.driver).send_keys(Keys.ENTER).perform()
+                # En algunos Typeforms, Enter es suficiente: se envía directo al elemento con foco
+                self.driver.switch_to.active_element.send_keys(Keys.ENTER)
             
-            time.sleep(3)
+            # Typeform reemplaza el formulario por la pantalla de agradecimiento
+            self._wait_briefly(
+                EC.any_of(EC.staleness_of(form), EC.presence_of_element_located((By.XPATH, _CONFIRMATION_XPATH))),
+                "cierre del Typeform"
+            )
             
             self.logger.info("✅ Typeform procesado")
             return True
@@ -527,36 +672,32 @@ class WebFormAutomator:
                 form_data = WebAutomationSettings.FORM_DATA
             
             # Esperar a que cargue la página
-            time.sleep(2)
+            self.wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
             
-            # Buscar todos los campos de entrada
-            text_inputs = self.driver.find_elements(By.CSS_SELECTOR, 
-                "input[type='text'], input[type='email'], textarea")
+            # Campos de texto, archivo y botón de envío en una sola llamada
+            fields = self.driver.execute_script(_DISCOVER_FIELDS_JS)
             
             # Llenar primeros campos encontrados
-            for i, input_field in enumerate(text_inputs[:3]):
+            for i, input_field in enumerate(fields['text'][:3]):
                 try:
-                    if input_field.is_displayed() and input_field.is_enabled():
-                        input_field.clear()
-                        if i == 0:
-                            input_field.send_keys(form_data.get('collaborator_name', 'Robot RPA'))
-                        elif i == 1:
-                            input_field.send_keys(datetime.now().strftime('%Y-%m-%d'))
-                        else:
-                            input_field.send_keys(form_data.get('comments', 'Reporte automático'))
-                        time.sleep(0.5)
+                    if i == 0:
+                        self._fill_field(input_field, form_data.get('collaborator_name', 'Robot RPA'))
+                    elif i == 1:
+                        self._fill_field(input_field, datetime.now().strftime('%Y-%m-%d'))
+                    else:
+                        self._fill_field(input_field, form_data.get('comments', 'Reporte automático'))
                 except:
                     continue
             
             # Subir archivo
-            file_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='file']")
-            if file_inputs:
-                file_inputs[0].send_keys(str(Path(attachment_path).absolute()))
-                time.sleep(2)
+            file_input = fields['file']
+            if file_input is not None:
+                file_input.send_keys(str(Path(attachment_path).absolute()))
+                # Input nativo: la selección es inmediata, basta con verificar el valor
+                self._wait_briefly(lambda d: bool(file_input.get_attribute('value')), "archivo seleccionado")
             
-            # Buscar botón de envío
-            submit_buttons = self.driver.find_elements(By.CSS_SELECTOR, 
-                "input[type='submit'], button[type='submit'], button:contains('Submit'), button:contains('Enviar')")
+            # Botón de envío
+            submit_button = fields['submit']
             
             # Envío condicionado por modo manual
             if not self.auto_submit:
@@ -565,9 +706,10 @@ class WebFormAutomator:
                 time.sleep(self.manual_review_seconds)
                 return True
 
-            if submit_buttons:
-                submit_buttons[0].click()
-                time.sleep(3)
+            if submit_button is not None:
+                submit_button.click()
+                # El envío navega a otra página: el botón deja de estar en el DOM
+                self._wait_briefly(EC.staleness_of(submit_button), "navegación tras envío")
             
             self.logger.info("✅ Formulario genérico procesado")
             return True
@@ -576,12 +718,27 @@ class WebFormAutomator:
             self.logger.error(f"Error en formulario genérico: {str(e)}")
             return False
     
+    def _set_resource_blocking(self, enabled: bool):
+        """
+        Activa o levanta el bloqueo de BLOCKED_URL_PATTERNS (sin efecto si BLOCK_RESOURCES=false)
+        
+        Args:
+            enabled: True para bloquear, False para permitir todos los recursos
+        """
+        if not WebAutomationSettings.BLOCK_RESOURCES:
+            return
+        urls = WebAutomationSettings.BLOCKED_URL_PATTERNS if enabled else []
+        try:
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': urls})
+        except WebDriverException as e:
+            self.logger.debug(f"No se pudo {'activar' if enabled else 'levantar'} el bloqueo de recursos: {e}")
+    
     def _take_screenshot(self, filename: str) -> str:
         """
         Toma screenshot de la página actual
         
         Args:
-            filename: Nombre del archivo
+            filename: Nombre del archivo (la extensión se ajusta a SCREENSHOT_FORMAT)
             
         Returns:
             str: Ruta del screenshot
@@ -590,13 +747,24 @@ class WebFormAutomator:
             if not self.driver:
                 return ""
             
-            screenshot_path = EVIDENCES_DIR / filename
-            
-            # Tomar screenshot
-            success = self.driver.save_screenshot(str(screenshot_path))
+            screenshot_path = (EVIDENCES_DIR / filename).with_suffix(WebAutomationSettings.SCREENSHOT_EXTENSION)
+            
+            # Tomar screenshot: en JPEG, Chrome codifica la imagen directamente (sin pasar por PNG)
+            capture = getattr(self.driver, 'execute_cdp_cmd', None)
+            if WebAutomationSettings.SCREENSHOT_FORMAT == 'jpeg' and capture is not None:
+                result = capture('Page.captureScreenshot', {
+                    'format': 'jpeg',
+                    'quality': WebAutomationSettings.SCREENSHOT_QUALITY,
+                })
+                screenshot_path.write_bytes(base64.b64decode(result['data']))
+                success = True
+            else:
+                screenshot_path = screenshot_path.with_suffix(FileSettings.IMAGE_EXTENSION)
+                success = self.driver.save_screenshot(str(screenshot_path))
             
             if success:
-                self.logger.info(f"📸 Screenshot guardado: {filename}")
+                self.logger.info(f"📸 Screenshot guardado: {screenshot_path.name}")
+                self._latest_screenshot = screenshot_path
                 return str(screenshot_path)
             else:
                 self.logger.warning(f"Error guardando screenshot: {filename}")
@@ -608,12 +776,18 @@ class WebFormAutomator:
     
     def _get_latest_screenshot(self) -> Optional[Path]:
         """Obtiene la captura más reciente del directorio de evidencias"""
+        # Captura tomada por esta instancia: no hace falta recorrer el directorio
+        if self._latest_screenshot is not None and self._latest_screenshot.exists():
+            return self._latest_screenshot
         try:
-            shots = list(EVIDENCES_DIR.glob("*.png"))
-            if not shots:
-                return None
-            shots.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-            return shots[0]
+            # Un solo recorrido O(N) con max(), sin construir ni ordenar la lista
+            with os.scandir(EVIDENCES_DIR) as entries:
+                latest = max(
+                    (e for e in entries if e.name.endswith(FileSettings.SCREENSHOT_EXTENSIONS) and e.is_file()),
+                    key=lambda e: e.stat().st_mtime,
+                    default=None,
+                )
+            return Path(latest.path) if latest else None
         except Exception:
             return None
 
@@ -632,26 +806,12 @@ class WebFormAutomator:
             health["form_url_configured"] = bool(WebAutomationSettings.FORM_URL)
             health["evidences_dir_exists"] = EVIDENCES_DIR.exists()
 
-            # Verificar ChromeDriver
-            try:
-                from webdriver_manager.chrome import ChromeDriverManager
-                driver_path = ChromeDriverManager().install()
-                health["chrome_driver_installed"] = bool(driver_path)
-            except:
-                pass
-
-            # Verificar WebDriver (sin inicializar completamente)
-            try:
-                from selenium import webdriver
-                from selenium.webdriver.chrome.options import Options
-                options = Options()
-                options.add_argument("--headless")
-                options.add_argument("--no-sandbox")
-                driver = webdriver.Chrome(options=options)
-                health["webdriver_available"] = True
-                driver.quit()
-            except:
-                pass
+            # Verificar Chrome y ChromeDriver sin lanzar el navegador (el check debe ser barato)
+            health["webdriver_available"] = any(shutil.which(name) for name in CHROME_EXECUTABLES)
+            health["chrome_driver_installed"] = bool(
+                (self._cached_driver_path and os.path.exists(self._cached_driver_path))
+                or shutil.which('chromedriver')
+            )
 
             return health
 
@@ -662,13 +822,39 @@ class WebFormAutomator:
                 **health
             }
 
+    def _reset_driver(self):
+        """Deja el driver listo para el siguiente formulario sin reiniciar Chrome"""
+        if not self.driver:
+            return
+        try:
+            # Con perfil de usuario las cookies son la sesión (p. ej. login de Google): se conservan
+            if not self.chrome_user_data_dir:
+                self.driver.delete_all_cookies()
+            self.driver.get('about:blank')
+        except Exception as e:
+            # Driver caído o navegador cerrado: se recreará en el próximo envío
+            self.logger.warning(f"No se pudo reiniciar el WebDriver, se cerrará: {str(e)}")
+            self._cleanup_driver()
+    
+    def close(self):
+        """Cierra el navegador persistente"""
+        self._cleanup_driver()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
     def _cleanup_driver(self):
         """Limpia recursos del driver"""
         try:
             if self.driver:
+                _LIVE_AUTOMATORS.discard(self)
                 self.driver.quit()
                 self.driver = None
                 self.wait = None
+                self._waits.clear()
                 self.logger.debug("WebDriver cerrado correctamente")
         except Exception as e:
             self.logger.warning(f"Error cerrando WebDriver: {str(e)}")
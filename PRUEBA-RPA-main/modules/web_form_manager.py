@@ -1,17 +1,27 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import atexit
 import time
 import os
 import logging
 from dotenv import load_dotenv
 
+# Importable como modules.web_form_manager o como web_form_manager (modules/ en sys.path)
+try:
+    from ._chromedriver_cache import start_chrome
+except ImportError:
+    from _chromedriver_cache import start_chrome
+
 load_dotenv()
 
+# Navegadores reutilizables entre llamadas a upload_to_web_form, por (headless, tamaño de ventana)
+_POOL = {}
+
+# Ruta de ChromeDriver resuelta en el primer arranque (también cacheada en disco)
+_DRIVER_PATH = None
+
 class WebFormManager:
     def __init__(self):
         self.logger = logging.getLogger('WebFormManager')
@@ -31,13 +41,26 @@ class WebFormManager:
         # Configurar ventana
         chrome_options.add_argument(f"--window-size={os.getenv('WINDOW_WIDTH', 1920)},{os.getenv('WINDOW_HEIGHT', 1080)}")
         
-        # Modo headless opcional
-        if os.getenv('HEADLESS_MODE', 'false').lower() == 'true':
+        # Sin interfaz por defecto; WEB_FORM_HEADLESS=false muestra el navegador
+        if _headless():
             chrome_options.add_argument('--headless=new')
         
+        # Solo hace falta el DOM del formulario: sin imágenes, notificaciones ni extensiones
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+        # driver.get() retorna en DOMContentLoaded; navigate_to_form espera el body explícitamente
+        chrome_options.page_load_strategy = "eager"
+        
+        global _DRIVER_PATH
         try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Selenium Manager (selenium>=4.11) resuelve ChromeDriver solo si no hay ruta conocida
+            self.driver = start_chrome(chrome_options, _DRIVER_PATH)
+            _DRIVER_PATH = self.driver.service.path
             self.driver.set_page_load_timeout(int(os.getenv('WEBDRIVER_TIMEOUT', 30)))
             self.wait = WebDriverWait(self.driver, int(os.getenv('ELEMENT_WAIT_TIME', 10)))
             
@@ -190,7 +213,45 @@ class WebFormManager:
         """Cerrar navegador"""
         if self.driver:
             self.driver.quit()
+            self.driver = None
             self.logger.info("🔒 Navegador cerrado")
+    
+    def reset(self):
+        """Limpiar estado del navegador para reutilizarlo sin reiniciar Chrome"""
+        try:
+            self.driver.delete_all_cookies()
+            self.driver.get("about:blank")
+            return True
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo reiniciar el navegador, se cerrará: {str(e)}")
+            try:
+                self.close()
+            except Exception:
+                self.driver = None
+            return False
+
+
+def _headless():
+    """Headless salvo que WEB_FORM_HEADLESS=false (propio de WebFormManager; no afecta a WebFormAutomator)"""
+    return os.getenv('WEB_FORM_HEADLESS', 'true').lower() != 'false'
+
+
+def _pool_key():
+    """Clave del pool según la configuración de ventana del .env"""
+    headless = _headless()
+    window_size = (os.getenv('WINDOW_WIDTH', '1920'), os.getenv('WINDOW_HEIGHT', '1080'))
+    return headless, window_size
+
+
+@atexit.register
+def _close_pool():
+    """Cerrar los navegadores del pool al terminar el intérprete"""
+    for web_manager in _POOL.values():
+        try:
+            web_manager.close()
+        except Exception:
+            pass
+    _POOL.clear()
 
 def upload_to_web_form(file_path):
     """Función principal para subir archivo"""
@@ -198,11 +259,14 @@ def upload_to_web_form(file_path):
         print("⚠️ Formulario web no habilitado en .env")
         return False
     
-    web_manager = WebFormManager()
+    # Reutilizar el navegador de una llamada anterior: Chrome solo se arranca una vez
+    key = _pool_key()
+    web_manager = _POOL.get(key) or WebFormManager()
     
     try:
-        if not web_manager.setup_driver():
+        if web_manager.driver is None and not web_manager.setup_driver():
             return False
+        _POOL[key] = web_manager
         
         if not web_manager.navigate_to_form():
             return False
@@ -222,4 +286,6 @@ def upload_to_web_form(file_path):
         return False
         
     finally:
-        web_manager.close()
+        # Dejar el navegador limpio para la siguiente subida; si falla, sale del pool
+        if web_manager.driver is None or not web_manager.reset():
+            _POOL.pop(key, None)
@@ -4,6 +4,8 @@ Soporta múltiples niveles, archivos rotatorios y colores
 """
 
 import os
+import gzip
+import shutil
 import logging
 import colorlog
 from datetime import datetime
@@ -75,30 +77,43 @@ class RPALogger:
         if os.getenv('LOG_TO_CONSOLE', 'true').lower() == 'true':
             self.logger.addHandler(console_handler)
     
-    def info(self, message, extra_data=None):
+    def isEnabledFor(self, level):
+        """Indica si un registro de este nivel sería emitido"""
+        return self.logger.isEnabledFor(level)
+    
+    def info(self, message, *args, extra_data=None):
         """Log nivel INFO"""
-        formatted_msg = self._format_message(message, extra_data)
-        self.logger.info(formatted_msg)
+        self._log(logging.INFO, message, args, extra_data)
     
-    def error(self, message, extra_data=None):
+    def error(self, message, *args, extra_data=None):
         """Log nivel ERROR"""
-        formatted_msg = self._format_message(message, extra_data)
-        self.logger.error(formatted_msg)
+        self._log(logging.ERROR, message, args, extra_data)
     
-    def warning(self, message, extra_data=None):
+    def warning(self, message, *args, extra_data=None):
         """Log nivel WARNING"""
-        formatted_msg = self._format_message(message, extra_data)
-        self.logger.warning(formatted_msg)
+        self._log(logging.WARNING, message, args, extra_data)
     
-    def debug(self, message, extra_data=None):
+    def debug(self, message, *args, extra_data=None):
         """Log nivel DEBUG"""
-        formatted_msg = self._format_message(message, extra_data)
-        self.logger.debug(formatted_msg)
+        self._log(logging.DEBUG, message, args, extra_data)
     
-    def critical(self, message, extra_data=None):
+    def critical(self, message, *args, extra_data=None):
         """Log nivel CRITICAL"""
-        formatted_msg = self._format_message(message, extra_data)
-        self.logger.critical(formatted_msg)
+        self._log(logging.CRITICAL, message, args, extra_data)
+    
+    def _log(self, level, message, args, extra_data=None):
+        """Emite el registro; los argumentos %-style solo se formatean si el nivel está habilitado"""
+        if not self.logger.isEnabledFor(level):
+            return
+        
+        if extra_data:
+            # Interpolar antes de anexar extra_data para que un '%' en sus valores no rompa el formato
+            if args:
+                message = message % args
+                args = ()
+            message = self._format_message(message, extra_data)
+        
+        self.logger.log(level, message, *args)
     
     def _format_message(self, message, extra_data=None):
         """Formatea el mensaje con datos adicionales"""
@@ -115,18 +130,18 @@ class RPALogger:
         step_msg = f"PASO {step_number}: {step_name} - {status}"
         
         if status.upper() in ["INICIADO", "STARTED", "BEGIN"]:
-            self.info(f"🚀 {step_msg}", details)
+            self.info(f"🚀 {step_msg}", extra_data=details)
         elif status.upper() in ["COMPLETADO", "COMPLETED", "SUCCESS"]:
-            self.info(f"✅ {step_msg}", details)
+            self.info(f"✅ {step_msg}", extra_data=details)
         elif status.upper() in ["ERROR", "FAILED", "FALLIDO"]:
-            self.error(f"❌ {step_msg}", details)
+            self.error(f"❌ {step_msg}", extra_data=details)
         elif status.upper() in ["WARNING", "ADVERTENCIA"]:
-            self.warning(f"⚠️ {step_msg}", details)
+            self.warning(f"⚠️ {step_msg}", extra_data=details)
         else:
-            self.info(step_msg, details)
+            self.info(step_msg, extra_data=details)
     
-    def log_api_call(self, url, method="GET", status_code=None, response_time=None):
-        """Log especializado para llamadas API"""
+    def log_api_call(self, url, method="GET", status_code=None, response_time=None, level=None):
+        """Log especializado para llamadas API (level reemplaza el nivel derivado del status)"""
         details = {
             "url": url,
             "method": method,
@@ -134,12 +149,14 @@ class RPALogger:
             "response_time_ms": response_time
         }
         
-        if status_code and 200 <= status_code < 300:
-            self.info(f"API CALL SUCCESS: {method} {url}", details)
+        if status_code and 200 <= status_code < 400:
+            label, default_level = "API CALL SUCCESS", logging.INFO
         elif status_code:
-            self.error(f"API CALL ERROR: {method} {url}", details)
+            label, default_level = "API CALL ERROR", logging.ERROR
         else:
-            self.info(f"API CALL: {method} {url}", details)
+            label, default_level = "API CALL", logging.INFO
+        
+        self._log(level or default_level, "%s: %s %s", (label, method, url), details)
     
     def log_db_operation(self, operation, table=None, records_affected=None, execution_time=None):
         """Log especializado para operaciones de base de datos"""
@@ -150,7 +167,7 @@ class RPALogger:
             "execution_time_ms": execution_time
         }
         
-        self.info(f"DB OPERATION: {operation}", details)
+        self.info("DB OPERATION: %s", operation, extra_data=details)
     
     def log_file_operation(self, operation, filepath, file_size=None, success=True):
         """Log especializado para operaciones de archivos"""
@@ -162,9 +179,9 @@ class RPALogger:
         }
         
         if success:
-            self.info(f"FILE OPERATION SUCCESS: {operation}", details)
+            self.info("FILE OPERATION SUCCESS: %s", operation, extra_data=details)
         else:
-            self.error(f"FILE OPERATION FAILED: {operation}", details)
+            self.error("FILE OPERATION FAILED: %s", operation, extra_data=details)
     
     def log_process_summary(self, start_time, end_time, total_records=None, files_created=None):
         """Log resumen del proceso completo"""
@@ -178,7 +195,7 @@ class RPALogger:
             "files_created": files_created
         }
         
-        self.info("=== PROCESO RPA COMPLETADO ===", summary)
+        self.info("=== PROCESO RPA COMPLETADO ===", extra_data=summary)
 
 
 def setup_logger(name="RPA", level="INFO"):
@@ -186,6 +203,18 @@ def setup_logger(name="RPA", level="INFO"):
     return RPALogger(name, level)
 
 
+def gzip_namer(default_name):
+    """Nombre de los archivos rotados por RotatingFileHandler: se agrega la extensión .gz"""
+    return f"{default_name}.gz"
+
+
+def gzip_rotator(source, dest):
+    """Rotador para RotatingFileHandler que comprime el archivo rotado con gzip"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
 def mask_sensitive_data(data, sensitive_keys=None):
     """Enmascara datos sensibles en logs"""
     if sensitive_keys is None:
@@ -211,13 +240,13 @@ default_logger = setup_logger()
 
 # Funciones de conveniencia
 def log_info(message, extra_data=None):
-    default_logger.info(message, extra_data)
+    default_logger.info(message, extra_data=extra_data)
 
 def log_error(message, extra_data=None):
-    default_logger.error(message, extra_data)
+    default_logger.error(message, extra_data=extra_data)
 
 def log_warning(message, extra_data=None):
-    default_logger.warning(message, extra_data)
+    default_logger.warning(message, extra_data=extra_data)
 
 def log_step(step_number, step_name, status="INICIADO", details=None):
     default_logger.log_step(step_number, step_name, status, details)